@@ -0,0 +1,226 @@
+import glob
+import hashlib
+import itertools
+import json
+import math
+import os
+import shelve
+import sys
+
+from heredity import (Model, exact_inference, gibbs_sampling,
+                      likelihood_weighting, load_data)
+
+# Default location of the on-disk cache of computed marginals
+CACHE = ".heredity_cache"
+
+# Most tie-breaking orderings to try when canonicalizing a family
+MAX_ORDERINGS = 5040
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python batch.py directory|glob "
+                 "[exact|gibbs|likelihood] [cache]")
+    method = sys.argv[2] if len(sys.argv) >= 3 else "exact"
+    cache = sys.argv[3] if len(sys.argv) == 4 else CACHE
+    if method not in ["exact", "gibbs", "likelihood"]:
+        sys.exit(f"Unknown inference method: {method}")
+
+    # Stream one JSON result per family
+    model = Model()
+    with shelve.open(cache) as db:
+        for filename in family_files(sys.argv[1]):
+            people = load_data(filename)
+            probabilities, cached = solve(people, method, model, db)
+            print(json.dumps({
+                "file": filename,
+                "cached": cached,
+                "probabilities": probabilities
+            }), flush=True)
+
+
+def family_files(pattern):
+    """
+    Return the sorted list of CSV files in directory `pattern`,
+    or matching glob `pattern` otherwise.
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.csv")
+    return sorted(glob.glob(pattern))
+
+
+def infer(people, method, model):
+    """
+    Return gene and trait distributions for each person using `method`.
+    """
+    if method == "exact":
+        return exact_inference(people, model)
+    elif method == "gibbs":
+        return gibbs_sampling(people, model)[0]
+    else:
+        return likelihood_weighting(people, model)[0]
+
+
+def solve(people, method, model, db):
+    """
+    Return a tuple of the distributions for each person in `people` and
+    whether they were found in cache `db`. Families with the same shape
+    share one cache entry.
+    """
+    key, order = canonicalize(people)
+    key = cache_key(key, method, model)
+
+    if key in db:
+        marginals = db[key]
+        cached = True
+    else:
+        renamed = rename(people, order)
+        probabilities = infer(renamed, method, model)
+        marginals = [
+            [probabilities[position]["gene"][genes] for genes in range(3)]
+            + [probabilities[position]["trait"][True]]
+            for position in range(len(order))
+        ]
+        db[key] = marginals
+        cached = False
+
+    position = {person: i for i, person in enumerate(order)}
+    return {
+        person: {
+            "gene": {genes: marginals[position[person]][genes]
+                     for genes in [2, 1, 0]},
+            "trait": {True: marginals[position[person]][3],
+                      False: 1 - marginals[position[person]][3]}
+        }
+        for person in people
+    }, cached
+
+
+def cache_key(shape, method, model):
+    """
+    Return a key identifying family `shape` under `method` and the tables
+    of `model`, so changing the model never reuses stale results.
+    """
+    text = json.dumps([shape, method, model.prior, model.inheritance,
+                       model.trait])
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def rename(people, order):
+    """
+    Return a copy of `people` with each person renamed to their
+    position in `order`.
+    """
+    position = {person: i for i, person in enumerate(order)}
+    return {
+        position[person]: {
+            "name": position[person],
+            "mother": position.get(people[person]["mother"]),
+            "father": position.get(people[person]["father"]),
+            "trait": people[person]["trait"]
+        }
+        for person in order
+    }
+
+
+def encode(people, order):
+    """
+    Return a tuple describing the family when people are numbered by
+    `order`: each person's trait and the positions of their parents.
+    Mother and father are interchangeable in the model, so parents
+    are sorted.
+    """
+    position = {person: i for i, person in enumerate(order)}
+    return tuple(
+        (
+            {None: 2, False: 0, True: 1}[people[person]["trait"]],
+            tuple(sorted(
+                position[parent]
+                for parent in (people[person]["mother"],
+                               people[person]["father"])
+                if parent is not None
+            ))
+        )
+        for person in order
+    )
+
+
+def refine(people):
+    """
+    Return a color for each person such that people who can be swapped by
+    renaming share a color, computed by repeatedly refining colors with
+    those of parents and children.
+    """
+    children = {person: [] for person in people}
+    for person in people:
+        for parent in (people[person]["mother"], people[person]["father"]):
+            if parent is not None:
+                children[parent].append(person)
+
+    colors = {
+        person: (people[person]["trait"] is None, people[person]["trait"],
+                 people[person]["mother"] is None)
+        for person in people
+    }
+    while True:
+        signatures = {
+            person: (
+                colors[person],
+                tuple(sorted(
+                    colors[parent]
+                    for parent in (people[person]["mother"],
+                                   people[person]["father"])
+                    if parent is not None
+                )),
+                tuple(sorted(colors[child] for child in children[person]))
+            )
+            for person in people
+        }
+
+        # Replace signatures by their rank so colors stay small
+        ranks = {
+            signature: rank
+            for rank, signature in enumerate(sorted(set(signatures.values())))
+        }
+        refined = {person: ranks[signatures[person]] for person in people}
+        if len(set(refined.values())) == len(set(colors.values())):
+            return refined
+        colors = refined
+
+
+def canonicalize(people):
+    """
+    Return a tuple of a canonical encoding of the family, which is the same
+    for any renaming of its people, and the order of people it describes.
+
+    People are ordered by color; ties are broken by trying every ordering
+    within each color and keeping the smallest encoding. When that would
+    take too many orderings, ties are broken by name instead, which is
+    still a valid key but shares fewer cache entries.
+    """
+    colors = refine(people)
+    classes = dict()
+    for person in sorted(people):
+        classes.setdefault(colors[person], []).append(person)
+    classes = [classes[color] for color in sorted(classes)]
+
+    orderings = math.prod(math.factorial(len(c)) for c in classes)
+    if orderings > MAX_ORDERINGS:
+        order = [person for c in classes for person in c]
+        return encode(people, order), order
+
+    best = None
+    for choice in itertools.product(
+        *(itertools.permutations(c) for c in classes)
+    ):
+        order = [person for c in choice for person in c]
+        encoding = encode(people, order)
+        if best is None or encoding < best[0]:
+            best = (encoding, order)
+    return best
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from generate import generate, save
+from heredity import (Model, exact_inference, gibbs_sampling,
+                      likelihood_weighting, load_data)
+
+# Largest pedigree to run exact enumeration on
+EXACT_LIMIT = 8
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) > 5:
+        sys.exit("Usage: python benchmark.py [sizes] [depth] [density] [seed]")
+    sizes = ([int(size) for size in sys.argv[1].split(",")]
+             if len(sys.argv) > 1 else [3, 5, 7, 8, 12, 25, 50, 100])
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    density = float(sys.argv[3]) if len(sys.argv) > 3 else 0.5
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+
+    model = Model()
+    methods = {
+        "exact": lambda people: exact_inference(people, model),
+        "gibbs": lambda people: gibbs_sampling(people, model, seed=seed)[0],
+        "likelihood": lambda people: likelihood_weighting(
+            people, model, seed=seed
+        )[0]
+    }
+
+    print(f"{'size':>6} {'method':>12} {'seconds':>10} {'peak KiB':>10} "
+          f"{'max diff':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            filename = os.path.join(directory, f"family{size}.csv")
+            save(generate(size, min(depth, size), density, seed=seed,
+                          model=model), filename)
+            people = load_data(filename)
+
+            results = dict()
+            for method, infer in methods.items():
+                if method == "exact" and size > EXACT_LIMIT:
+                    continue
+                results[method] = measure(infer, people)
+
+            # Compare against exact results where available
+            reference = results.get("exact", results["gibbs"])[0]
+            for method, (probabilities, seconds, peak) in results.items():
+                diff = difference(probabilities, reference)
+                print(f"{size:>6} {method:>12} {seconds:>10.4f} "
+                      f"{peak / 1024:>10.1f} {diff:>10.4f}")
+
+
+def measure(infer, people):
+    """
+    Run `infer` on `people`, returning a tuple of its result, the time it
+    took in seconds and its peak memory use in bytes.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    probabilities = infer(people)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return probabilities, seconds, peak
+
+
+def difference(probabilities, reference):
+    """
+    Return the largest absolute difference between two sets of
+    gene and trait distributions.
+    """
+    return max(
+        abs(probabilities[person][field][value] -
+            reference[person][field][value])
+        for person in reference
+        for field in reference[person]
+        for value in reference[person][field]
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import csv
+import random
+import sys
+
+from heredity import Model
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [5, 6]:
+        sys.exit("Usage: python generate.py size depth density output.csv "
+                 "[seed]")
+    size = int(sys.argv[1])
+    depth = int(sys.argv[2])
+    density = float(sys.argv[3])
+    seed = int(sys.argv[5]) if len(sys.argv) == 6 else None
+
+    rows = generate(size, depth, density, seed=seed)
+    save(rows, sys.argv[4])
+
+
+def generate(size, depth, density, seed=None, model=None):
+    """
+    Return rows (dictionaries with fields name, mother, father, trait) of a
+    random pedigree of `size` people spread over `depth` generations.
+
+    The first generation are founders. Every later person is a child of
+    someone from the previous generation and either another member of that
+    generation or a new founder who marries in. Genes and traits are sampled
+    from `model`, and each trait is kept as evidence with probability
+    `density`.
+    """
+    if not 1 <= depth <= size:
+        raise ValueError("depth must be between 1 and size")
+    if model is None:
+        model = Model()
+    rng = random.Random(seed)
+
+    rows = []
+    genes = dict()
+
+    def add(mother, father):
+        name = f"P{len(rows)}"
+        if mother is None:
+            weights = model.prior
+        else:
+            base = (genes[mother] * 3 + genes[father]) * 3
+            weights = model.inheritance[base:base + 3]
+        genes[name] = rng.choices(range(3), weights=weights)[0]
+        trait = rng.random() < model.trait[genes[name] * 2 + 1]
+        rows.append({
+            "name": name,
+            "mother": mother or "",
+            "father": father or "",
+            "trait": (("1" if trait else "0") if rng.random() < density
+                      else "")
+        })
+        return name
+
+    # Split people as evenly as possible between generations
+    sizes = [size // depth + (i < size % depth) for i in range(depth)]
+
+    previous = [add(None, None) for _ in range(sizes[0])]
+    for count in sizes[1:]:
+        target = len(rows) + count
+        children = []
+        while len(rows) < target:
+            parent = rng.choice(previous)
+            candidates = [person for person in previous if person != parent]
+            if candidates and rng.random() < 0.5:
+                partner = rng.choice(candidates)
+            elif target - len(rows) >= 2:
+
+                # A founder marrying in counts towards this generation
+                partner = add(None, None)
+            else:
+                add(None, None)
+                continue
+            children.append(add(parent, partner))
+        previous = children or previous
+
+    return rows
+
+
+def save(rows, filename):
+    """
+    Write pedigree `rows` to CSV file `filename`.
+    """
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["name", "mother", "father",
+                                               "trait"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 import csv
 import itertools
+import math
 import sys
 
+import numpy as np
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -36,16 +39,91 @@ PROBS = {
     "mutation": 0.01
 }
 
+# z-score used for the confidence intervals of approximate inference
+CONFIDENCE = 1.96
+
+
+class Model():
+    """
+    Probability tables compiled once from a `PROBS`-style dictionary.
+    Each table is a flat list indexed by numbers of genes:
+        * `prior[genes]` for people with no parents listed,
+        * `inheritance[(mother * 3 + father) * 3 + child]` for children,
+        * `trait[genes * 2 + trait]` for having the trait.
+    """
+
+    def __init__(self, probs=None):
+        if probs is None:
+            probs = PROBS
+
+        # Probability of passing the gene on, given the parent's genes
+        passing = [probs["mutation"], 0.5, 1 - probs["mutation"]]
+
+        self.prior = [probs["gene"][genes] for genes in range(3)]
+        self.inheritance = []
+        for mother in range(3):
+            for father in range(3):
+                m, f = passing[mother], passing[father]
+                self.inheritance.extend([
+                    (1 - m) * (1 - f),
+                    m * (1 - f) + f * (1 - m),
+                    m * f
+                ])
+        self.trait = [
+            probs["trait"][genes][trait]
+            for genes in range(3)
+            for trait in [False, True]
+        ]
+
+    def arrays(self):
+        """
+        Return the prior, inheritance and trait tables as numpy arrays
+        of shape (3,), (3, 3, 3) and (3, 2).
+        """
+        return (np.array(self.prior),
+                np.array(self.inheritance).reshape(3, 3, 3),
+                np.array(self.trait).reshape(3, 2))
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python heredity.py data.csv [exact|gibbs|likelihood]")
     people = load_data(sys.argv[1])
+    method = sys.argv[2] if len(sys.argv) == 3 else "exact"
+    model = Model()
+
+    # Compute gene and trait probabilities for each person
+    intervals = None
+    if method == "exact":
+        probabilities = exact_inference(people, model)
+    elif method == "gibbs":
+        probabilities, intervals = gibbs_sampling(people, model)
+    elif method == "likelihood":
+        probabilities, intervals = likelihood_weighting(people, model)
+    else:
+        sys.exit(f"Unknown inference method: {method}")
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                if intervals is None:
+                    print(f"    {value}: {p:.4f}")
+                else:
+                    low, high = intervals[person][field][value]
+                    print(f"    {value}: {p:.4f}  [{low:.4f}, {high:.4f}]")
+
+
+def empty_probabilities(people):
+    """
+    Return a gene and trait distribution of all zeros for each person.
+    """
+    return {
         person: {
             "gene": {
                 2: 0,
@@ -60,6 +138,18 @@ def main():
         for person in people
     }
 
+
+def exact_inference(people, model=None):
+    """
+    Compute gene and trait distributions for each person by enumerating
+    every assignment of genes and traits consistent with the evidence.
+    """
+    if model is None:
+        model = Model()
+
+    # Keep track of gene and trait probabilities for each person
+    probabilities = empty_probabilities(people)
+
     # Loop over all sets of people who might have the trait
     names = set(people)
     for have_trait in powerset(names):
@@ -78,20 +168,13 @@ def main():
             for two_genes in powerset(names - one_gene):
 
                 # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
+                p = joint_probability(people, one_gene, two_genes,
+                                      have_trait, model)
                 update(probabilities, one_gene, two_genes, have_trait, p)
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    return probabilities
 
 
 def load_data(filename):
@@ -128,7 +211,7 @@ def powerset(s):
     ]
 
 
-def joint_probability(people, one_gene, two_genes, have_trait):
+def joint_probability(people, one_gene, two_genes, have_trait, model=None):
     """
     Compute and return a joint probability.
 
@@ -138,56 +221,36 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone not in `one_gene` or `two_gene` does not have the gene, and
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
-    """
-    
-    probability = float(1)
 
-    for person in people:
-
-        if person in two_genes:
-            genes = 2
-        elif person in one_gene:
-            genes = 1
-        else:
-            genes = 0
+    Probabilities are read from the tables of `model`, compiled from
+    `PROBS` if not given.
+    """
+    if model is None:
+        model = Model()
 
+    genes = {
+        person: 2 if person in two_genes else 1 if person in one_gene else 0
+        for person in people
+    }
 
-        if person in have_trait:
-            trait = True
-        else:
-            trait = False
+    probability = float(1)
 
+    for person in people:
 
         mother = people[person]['mother']
         father = people[person]['father']
 
         if mother is None and father is None:
-            probability *= PROBS['gene'][genes]
+            probability *= model.prior[genes[person]]
         else:
-            inherit_prob = {mother: 0, father: 0}
-
-            for parent in inherit_prob:
-                if parent in two_genes:
-                    inherit_prob[parent] = 1 - PROBS['mutation']
-                elif parent in one_gene:
-                    inherit_prob[parent] = 0.5
-                    #selecting my bad gene (1) or selecting the good gene and mutating it (0.5)
-                else:
-                    inherit_prob[parent] = PROBS['mutation']
-
-            if genes == 2:
-                probability *= inherit_prob[mother] * inherit_prob[father]
-            elif genes == 1:
-                #bad gene from mom and good from dad or bad gene from dad and good from mom
-                #(1 - inherit) -> good gene
-                probability *= (1 - inherit_prob[mother]) * inherit_prob[father] + (1 - inherit_prob[father]) * inherit_prob[mother]
-            else:
-                probability *= (1 - inherit_prob[mother]) * (1 - inherit_prob[father])
+            probability *= model.inheritance[
+                (genes[mother] * 3 + genes[father]) * 3 + genes[person]
+            ]
+
+        probability *= model.trait[genes[person] * 2 + (person in have_trait)]
 
-        probability *= PROBS["trait"][genes][trait]
-        
     return probability
- 
+
 
 def update(probabilities, one_gene, two_genes, have_trait, p):
     """
@@ -243,9 +306,276 @@ def normalize(probabilities):
         trait_sum = probabilities[person]["trait"][True] + probabilities[person]["trait"][False]
         probabilities[person]["trait"][True]  /= trait_sum
         probabilities[person]["trait"][False] /= trait_sum
-        
 
-            
+
+def topological_order(people):
+    """
+    Return a list of all people, ordered so that parents always come
+    before their children.
+    """
+    order = []
+    placed = set()
+    for person in people:
+        stack = [person]
+        while stack:
+            current = stack[-1]
+            if current in placed:
+                stack.pop()
+                continue
+            parents = [
+                parent for parent in (people[current]["mother"],
+                                      people[current]["father"])
+                if parent is not None and parent not in placed
+            ]
+            if parents:
+                stack.extend(parents)
+            else:
+                placed.add(current)
+                order.append(current)
+                stack.pop()
+    return order
+
+
+def draw(probabilities, rng):
+    """
+    Sample a number of genes from each row of an array whose last axis
+    is the probability of 0, 1 and 2 genes.
+    """
+    cumulative = np.cumsum(probabilities, axis=-1)
+    cumulative /= cumulative[..., -1:]
+    sample = rng.random(probabilities.shape[:-1] + (1,))
+    return (sample >= cumulative[..., :2]).sum(axis=-1)
+
+
+def evidence_likelihood(traits, trait):
+    """
+    Return the likelihood of the known `trait` for 0, 1 and 2 genes,
+    or all ones if the trait is unknown.
+    """
+    if trait is None:
+        return np.ones(3)
+    return traits[:, int(trait)]
+
+
+def features(genes, traits, trait):
+    """
+    Return, for an array of sampled gene counts, a matrix whose columns are
+    the indicators of 0, 1 and 2 genes followed by the probability of the
+    trait. Known traits are used as is.
+    """
+    columns = np.zeros(genes.shape + (4,))
+    columns[..., 0] = genes == 0
+    columns[..., 1] = genes == 1
+    columns[..., 2] = genes == 2
+    if trait is None:
+        columns[..., 3] = traits[genes, 1]
+    else:
+        columns[..., 3] = float(trait)
+    return columns
+
+
+def sample_genes(people, order, size, rng, model):
+    """
+    Draw `size` samples of everyone's genes from `model`, ignoring trait
+    evidence. Returns a dictionary mapping each person to an array of genes.
+    """
+    prior, inheritance, _ = model.arrays()
+    genes = dict()
+    for person in order:
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        if mother is None and father is None:
+            genes[person] = rng.choice(3, size=size, p=prior)
+        else:
+            genes[person] = draw(
+                inheritance[genes[mother], genes[father]], rng
+            )
+    return genes
+
+
+def distributions(people, estimates, errors):
+    """
+    Turn per-person arrays of [P(0 genes), P(1 gene), P(2 genes), P(trait)]
+    estimates and their confidence half-widths into `probabilities` and
+    `intervals` dictionaries.
+    """
+    probabilities = empty_probabilities(people)
+    intervals = dict()
+    for person in people:
+        estimate = estimates[person]
+        error = errors[person]
+        values = {
+            "gene": {genes: (estimate[genes], error[genes])
+                     for genes in [2, 1, 0]},
+            "trait": {True: (estimate[3], error[3]),
+                      False: (1 - estimate[3], error[3])}
+        }
+        intervals[person] = {"gene": dict(), "trait": dict()}
+        for field in values:
+            for value, (p, e) in values[field].items():
+
+                # Rounding can push weighted means just past 0 or 1
+                p = min(max(p, 0), 1)
+                probabilities[person][field][value] = float(p)
+                intervals[person][field][value] = (
+                    float(max(p - e, 0)), float(min(p + e, 1))
+                )
+    return probabilities, intervals
+
+
+def gibbs_sampling(people, model=None, tolerance=0.01, chains=256, burn_in=100,
+                   batch=50, max_sweeps=20000, seed=None):
+    """
+    Estimate gene and trait distributions for each person with Gibbs
+    sampling over everyone's genes, conditioned on the known traits.
+
+    All `chains` are advanced together, one person at a time, so each draw
+    is a vectorized batch across chains. Estimates average each person's
+    full conditional distribution; confidence intervals come from the spread
+    of the independent chains. Sampling stops once every interval is within
+    `tolerance` of its estimate, or after `max_sweeps` sweeps.
+
+    Returns a tuple of `probabilities` and `intervals` dictionaries.
+    """
+    if model is None:
+        model = Model()
+    rng = np.random.default_rng(seed)
+    prior, inheritance, traits = model.arrays()
+    order = topological_order(people)
+    children = {person: [] for person in people}
+    for person in people:
+        for parent in (people[person]["mother"], people[person]["father"]):
+            if parent is not None:
+                children[parent].append(person)
+
+    # Start every chain from a sample of the prior
+    genes = sample_genes(people, order, chains, rng, model)
+    totals = {person: np.zeros((chains, 4)) for person in people}
+
+    sweep = 0
+    while True:
+        sweep += 1
+        for person in order:
+            mother = people[person]["mother"]
+            father = people[person]["father"]
+            trait = people[person]["trait"]
+
+            # Probability of each gene count given parents and trait
+            if mother is None and father is None:
+                conditional = np.tile(prior, (chains, 1))
+            else:
+                conditional = inheritance[genes[mother], genes[father]]
+            conditional = conditional * evidence_likelihood(traits, trait)
+
+            # Probability of each child's genes given each gene count
+            for child in children[person]:
+                if people[child]["mother"] == person:
+                    other = genes[people[child]["father"]]
+                    conditional *= inheritance[:, other, genes[child]].T
+                else:
+                    other = genes[people[child]["mother"]]
+                    conditional *= inheritance[other, :, genes[child]]
+
+            conditional /= conditional.sum(axis=1, keepdims=True)
+            genes[person] = draw(conditional, rng)
+
+            # Average full conditionals rather than raw samples
+            if sweep > burn_in:
+                totals[person][:, :3] += conditional
+                if trait is None:
+                    totals[person][:, 3] += conditional @ traits[:, 1]
+                else:
+                    totals[person][:, 3] += float(trait)
+
+        samples = sweep - burn_in
+        if samples <= 0 or (samples % batch and sweep < max_sweeps):
+            continue
+
+        # Compare independent chains to bound the error of the estimate
+        estimates = dict()
+        errors = dict()
+        for person in people:
+            means = totals[person] / samples
+            estimates[person] = means.mean(axis=0)
+            errors[person] = (CONFIDENCE * means.std(axis=0, ddof=1)
+                              / math.sqrt(chains))
+        worst = max(error.max() for error in errors.values())
+        if worst <= tolerance or sweep >= max_sweeps:
+            return distributions(people, estimates, errors)
+
+
+def likelihood_weighting(people, model=None, tolerance=0.01, batch=10000,
+                         max_samples=10000000, seed=None):
+    """
+    Estimate gene and trait distributions for each person with likelihood
+    weighting: genes are sampled from the model in vectorized batches and
+    each sample is weighted by the likelihood of the known traits.
+
+    Confidence intervals use the variance of the weighted ratio estimate.
+    Sampling stops once every interval is within `tolerance` of its
+    estimate, or after `max_samples` samples.
+
+    Returns a tuple of `probabilities` and `intervals` dictionaries.
+    """
+    if model is None:
+        model = Model()
+    rng = np.random.default_rng(seed)
+    _, _, traits = model.arrays()
+    order = topological_order(people)
+
+    # Weighted sums, kept relative to the largest log weight seen so far
+    shift = -math.inf
+    weight = weight_squared = 0.0
+    first = {person: np.zeros(4) for person in people}
+    second = {person: np.zeros(4) for person in people}
+    third = {person: np.zeros(4) for person in people}
+
+    samples = 0
+    while True:
+        genes = sample_genes(people, order, batch, rng, model)
+        log_weights = np.zeros(batch)
+        for person in people:
+            trait = people[person]["trait"]
+            if trait is not None:
+                log_weights += np.log(
+                    evidence_likelihood(traits, trait)[genes[person]]
+                )
+
+        # Rescale the running sums if this batch has a larger weight
+        top = log_weights.max()
+        if top > shift:
+            if shift > -math.inf:
+                scale = math.exp(shift - top)
+                weight *= scale
+                weight_squared *= scale ** 2
+                for person in people:
+                    first[person] *= scale
+                    second[person] *= scale ** 2
+                    third[person] *= scale ** 2
+            shift = top
+        weights = np.exp(log_weights - shift)
+        weight += weights.sum()
+        weight_squared += (weights ** 2).sum()
+        for person in people:
+            x = features(genes[person], traits,
+                         people[person]["trait"])
+            first[person] += weights @ x
+            second[person] += (weights ** 2) @ x
+            third[person] += (weights ** 2) @ (x ** 2)
+        samples += batch
+
+        # Delta-method variance of each weighted ratio estimate
+        estimates = dict()
+        errors = dict()
+        for person in people:
+            p = first[person] / weight
+            variance = (third[person] - 2 * p * second[person]
+                        + p ** 2 * weight_squared) / weight ** 2
+            estimates[person] = p
+            errors[person] = CONFIDENCE * np.sqrt(np.maximum(variance, 0))
+        worst = max(error.max() for error in errors.values())
+        if worst <= tolerance or samples >= max_samples:
+            return distributions(people, estimates, errors)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,69 @@
+import json
+import sys
+import time
+
+from generate import generate
+from logic import model_check
+
+# Largest number of characters to run each engine on; past 100 resolution
+# hits MAX_RESOLVENTS on some queries and only answers through DPLL
+LIMITS = {
+    "enumerate": 20,
+    "parallel": 20,
+    "bitwise": 12,
+    "dpll": 100,
+    "resolution": 100
+}
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) > 5:
+        sys.exit("Usage: python benchmark.py [sizes] [depth] [seed] "
+                 "[output.json]")
+    sizes = ([int(size) for size in sys.argv[1].split(",")]
+             if len(sys.argv) > 1 else [2, 4, 6, 8, 10, 12, 20, 40, 100])
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    results = benchmark(sizes, depth, seed)
+    output = json.dumps(results, indent=4)
+    if len(sys.argv) > 4:
+        with open(sys.argv[4], "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+def benchmark(sizes, depth, seed):
+    """
+    Times every entailment engine on a generated puzzle of each size,
+    asking whether the knowledge base entails each symbol.
+    Returns a list of results, one per puzzle.
+    """
+    results = []
+    for size in sizes:
+        knowledge, symbols, roles = generate(size, depth, seed=seed)
+        seconds = dict()
+        answers = dict()
+        for method, limit in LIMITS.items():
+            if size > limit:
+                continue
+            start = time.perf_counter()
+            answers[method] = [model_check(knowledge, symbol, method=method)
+                               for symbol in symbols]
+            seconds[method] = time.perf_counter() - start
+
+        results.append({
+            "characters": size,
+            "symbols": len(symbols),
+            "seconds": seconds,
+            "agree": len(set(map(tuple, answers.values()))) == 1,
+            "entailed": sum(next(iter(answers.values())))
+        })
+    return results
+
+
+if __name__ == "__main__":
+    main()
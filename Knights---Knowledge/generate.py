@@ -0,0 +1,84 @@
+import random
+import sys
+
+from logic import *
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python generate.py characters [depth] [seed]")
+    characters = int(sys.argv[1])
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    knowledge, symbols, roles = generate(characters, depth, seed=seed)
+    print(knowledge.formula())
+    for name, knight in roles.items():
+        print(f"    {name} is a {'Knight' if knight else 'Knave'}")
+
+
+def names(characters):
+    """Returns character names: letters, then numbered names past Z."""
+    return [chr(ord("A") + i) if characters <= 26 else f"P{i}"
+            for i in range(characters)]
+
+
+def generate(characters, depth=2, statements=2, seed=None):
+    """
+    Generates a knights and knaves puzzle with the given number of
+    characters, each making up to `statements` random statements nested
+    `depth` deep about who is a knight or a knave.
+
+    Roles are chosen first and every statement is made true or false to
+    match its speaker, so the puzzle always has a solution.
+    Returns a tuple of the knowledge base, the list of symbols and the
+    hidden roles, a dict mapping each name to True for knights.
+    """
+    rng = random.Random(seed)
+    people = names(characters)
+    knight = {name: Symbol(f"{name} is a Knight") for name in people}
+    knave = {name: Symbol(f"{name} is a Knave") for name in people}
+    roles = {name: rng.random() < 0.5 for name in people}
+    model = dict()
+    for name in people:
+        model[knight[name].name] = roles[name]
+        model[knave[name].name] = not roles[name]
+
+    def statement(depth):
+        if depth == 0 or rng.random() < 0.3:
+            name = rng.choice(people)
+            return rng.choice([knight[name], knave[name]])
+        kind = rng.randrange(5)
+        if kind == 0:
+            return Not(statement(depth - 1))
+        elif kind == 1:
+            return And(statement(depth - 1), statement(depth - 1))
+        elif kind == 2:
+            return Or(statement(depth - 1), statement(depth - 1))
+        elif kind == 3:
+            return Implication(statement(depth - 1), statement(depth - 1))
+        else:
+            return Biconditional(statement(depth - 1), statement(depth - 1))
+
+    knowledge = []
+    for name in people:
+        knowledge.append(Or(knight[name], knave[name]))
+        knowledge.append(Not(And(knight[name], knave[name])))
+        for _ in range(rng.randint(1, statements)):
+
+            # Knights only say true things and knaves only false ones
+            said = statement(depth)
+            if said.evaluate(model) != roles[name]:
+                said = Not(said)
+            knowledge.append(Implication(knight[name], said))
+            knowledge.append(Implication(knave[name], Not(said)))
+
+    symbols = [symbol for name in people
+               for symbol in (knight[name], knave[name])]
+    return And(*knowledge), symbols, roles
+
+
+if __name__ == "__main__":
+    main()
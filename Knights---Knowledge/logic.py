@@ -1,19 +1,63 @@
+import collections
+import heapq
 import itertools
+import multiprocessing
+import os
+import weakref
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 
 class Sentence():
+    """
+    Logical sentence. Sentences are immutable and hash-consed: building a
+    sentence equal to one that already exists returns the existing node,
+    whose hash and symbols are computed once at construction.
+    """
+
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+
+    # Every live sentence, keyed by its class and operands
+    _interned = weakref.WeakValueDictionary()
+
+    @classmethod
+    def _intern(cls, key, symbols, **fields):
+        """Returns the node for key, creating it with fields if needed."""
+        node = Sentence._interned.get((cls, key))
+        if node is None:
+            node = object.__new__(cls)
+            for field, value in fields.items():
+                object.__setattr__(node, field, value)
+            object.__setattr__(node, "_hash", hash((cls.__name__, key)))
+            object.__setattr__(node, "_symbols", frozenset(symbols))
+            Sentence._interned[(cls, key)] = node
+        return node
+
+    def __setattr__(self, name, value):
+        raise AttributeError("logical sentences are immutable")
+
+    def __hash__(self):
+        return self._hash
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence in a model that may leave some
+        symbols unassigned. Returns True or False if the value is the same
+        however they are assigned, None otherwise.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozen set of all symbols in the logical sentence."""
+        return frozenset()
 
     @classmethod
     def validate(cls, sentence):
@@ -44,14 +88,13 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ("name",)
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+    def __new__(cls, name):
+        return cls._intern(name, [name], name=name)
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __reduce__(self):
+        return (Symbol, (self.name,))
 
     def __repr__(self):
         return self.name
@@ -62,23 +105,27 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
     def formula(self):
         return self.name
 
     def symbols(self):
-        return {self.name}
+        return self._symbols
 
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    __slots__ = ("operand",)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls._intern(operand, operand._symbols, operand=operand)
+
+    def __reduce__(self):
+        return (Not, (self.operand,))
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,27 +133,33 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
     def symbols(self):
-        return self.operand.symbols()
+        return self._symbols
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
-        for conjunct in conjuncts:
-            Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+    __slots__ = ("conjuncts",)
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
+    def __new__(cls, *conjuncts):
+        for conjunct in conjuncts:
+            Sentence.validate(conjunct)
+        return cls._intern(
+            conjuncts,
+            frozenset().union(*[conjunct._symbols for conjunct in conjuncts]),
+            conjuncts=conjuncts
         )
 
+    def __reduce__(self):
+        return (And, self.conjuncts)
+
     def __repr__(self):
         conjunctions = ", ".join(
             [str(conjunct) for conjunct in self.conjuncts]
@@ -114,12 +167,22 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        raise TypeError("logical sentences are immutable, "
+                        "use And(*knowledge.conjuncts, conjunct) instead")
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
@@ -127,23 +190,25 @@ class And(Sentence):
                            for conjunct in self.conjuncts])
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return self._symbols
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
-        for disjunct in disjuncts:
-            Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+    __slots__ = ("disjuncts",)
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
+    def __new__(cls, *disjuncts):
+        for disjunct in disjuncts:
+            Sentence.validate(disjunct)
+        return cls._intern(
+            disjuncts,
+            frozenset().union(*[disjunct._symbols for disjunct in disjuncts]),
+            disjuncts=disjuncts
         )
 
+    def __reduce__(self):
+        return (Or, self.disjuncts)
+
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
@@ -151,6 +216,16 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
@@ -158,23 +233,24 @@ class Or(Sentence):
                             for disjunct in self.disjuncts])
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        return self._symbols
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
-
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return cls._intern(
+            (antecedent, consequent),
+            antecedent._symbols | consequent._symbols,
+            antecedent=antecedent, consequent=consequent
+        )
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def __reduce__(self):
+        return (Implication, (self.antecedent, self.consequent))
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +259,41 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is True and consequent is False:
+            return False
+        return None
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        return self._symbols
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
+        return cls._intern(
+            (left, right),
+            left._symbols | right._symbols,
+            left=left, right=right
+        )
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def __reduce__(self):
+        return (Biconditional, (self.left, self.right))
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,48 +304,829 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+        return self._symbols
+
+
+def model_check(knowledge, query, method="enumerate"):
+    """
+    Checks if knowledge base entails query.
+
+    `method` selects the inference engine: "enumerate" searches every
+    model, skipping partial models that cannot change the answer,
+    "parallel" splits that search across processes, "bitwise" checks
+    blocks of models at once with bitwise operations, "dpll" converts
+    to CNF and searches for a counter-model with DPLL and "resolution"
+    refutes the negated query by resolution.
+    """
+    if method == "dpll":
+        return dpll_check(knowledge, query)
+    elif method == "resolution":
+        return resolution_check(knowledge, query)
+    elif method == "bitwise":
+        return bitwise_check(knowledge, query)
+    elif method == "parallel":
+        return parallel_check(knowledge, query)
+    elif method != "enumerate":
+        raise ValueError(f"unknown model checking method {method}")
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = sorted(knowledge.symbols() | query.symbols())
 
     # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    return check_all(knowledge, query, symbols)
+
+
+def check_all(knowledge, query, symbols, model=None, stop=None):
+    """
+    Checks if knowledge base entails query by a depth-first search over
+    assignments to symbols, in order, extending model if given.
+
+    The model is extended and shrunk in place along an undo trail, and
+    every partial model is evaluated with three-valued logic: the search
+    skips a partial model once the knowledge base is false or the query is
+    true in all of its completions, and stops as soon as the knowledge base
+    is true and the query false in all of them.
+
+    If stop is given, it is an event checked now and then; once it is set,
+    the search gives up and returns None.
+    """
+    model = dict() if model is None else dict(model)
+    trail = []
+    stack = [(0, None)]
+    visited = 0
+    while stack:
+        depth, value = stack.pop()
+        visited += 1
+        if stop is not None and visited % 1024 == 0 and stop.is_set():
+            return None
+
+        # Undo assignments deeper than this one, then make it
+        while len(trail) > depth:
+            del model[trail.pop()]
+        if value is not None:
+            model[symbols[depth]] = value
+            trail.append(symbols[depth])
+            depth += 1
+
+        kb = knowledge.evaluate_partial(model)
+        if kb is False:
+            continue
+        q = query.evaluate_partial(model)
+        if q is True:
+            continue
+        if kb is True and q is False:
+            return False
+
+        # Try the next symbol as true first, then as false
+        if depth < len(symbols):
+            stack.append((depth, False))
+            stack.append((depth, True))
+    return True
+
+
+def occurrences(sentence):
+    """Returns a Counter of how many times each symbol occurs in sentence."""
+    counts = collections.Counter()
+    stack = [sentence]
+    while stack:
+        sentence = stack.pop()
+        if isinstance(sentence, Symbol):
+            counts[sentence.name] += 1
+        elif isinstance(sentence, Not):
+            stack.append(sentence.operand)
+        elif isinstance(sentence, And):
+            stack.extend(sentence.conjuncts)
+        elif isinstance(sentence, Or):
+            stack.extend(sentence.disjuncts)
+        elif isinstance(sentence, Implication):
+            stack.extend([sentence.antecedent, sentence.consequent])
+        elif isinstance(sentence, Biconditional):
+            stack.extend([sentence.left, sentence.right])
+    return counts
+
+
+# Knowledge base, query and stop event of a parallel_check worker process
+_worker = dict()
+
+
+def _start_worker(knowledge, query, stop):
+    _worker.update(knowledge=knowledge, query=query, stop=stop)
+
+
+def _check_split(assignment, symbols):
+    """Checks entailment in a worker, given values for some symbols."""
+    result = check_all(_worker["knowledge"], _worker["query"], symbols,
+                       assignment, _worker["stop"])
+    if result is False:
+        _worker["stop"].set()
+    return result
+
+
+def parallel_check(knowledge, query, processes=None, split=None):
+    """
+    Checks if knowledge base entails query by splitting the search on the
+    split most frequent symbols and checking each of the 2 ** split
+    assignments to them on a pool of processes. All workers stop as soon
+    as one finds a counter-model.
+
+    By default, uses one process per CPU and splits into about four
+    searches per process.
+    """
+    counts = occurrences(knowledge) + occurrences(query)
+    symbols = sorted(knowledge.symbols() | query.symbols(),
+                     key=lambda name: (-counts[name], name))
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if split is None:
+        split = (4 * processes - 1).bit_length()
+    first, rest = symbols[:split], symbols[split:]
+
+    stop = multiprocessing.Event()
+    with ProcessPoolExecutor(processes, initializer=_start_worker,
+                             initargs=(knowledge, query, stop)) as executor:
+        futures = [
+            executor.submit(_check_split, dict(zip(first, values)), rest)
+            for values in itertools.product([True, False], repeat=len(first))
+        ]
+        for future in as_completed(futures):
+            if future.result() is False:
+                stop.set()
+                for other in futures:
+                    other.cancel()
+                return False
+    return True
+
+
+def model_check_all(knowledge, queries, method="enumerate"):
+    """
+    Checks which of queries the knowledge base entails, finding the models
+    of the knowledge base only once for all of them.
+    Returns a list with one boolean per query.
+
+    `method` is "enumerate", "bitwise" or "dpll", as for model_check.
+    """
+    queries = list(queries)
+    if method == "dpll":
+        return dpll_check_all(knowledge, queries)
+    elif method == "bitwise":
+        return bitwise_check_all(knowledge, queries)
+    elif method != "enumerate":
+        raise ValueError(f"unknown model checking method {method}")
+
+    symbols = sorted(knowledge.symbols().union(
+        *[query.symbols() for query in queries]
+    ))
+    return check_all_queries(knowledge, queries, symbols)
+
+
+def check_all_queries(knowledge, queries, symbols):
+    """
+    Checks which of queries the knowledge base entails by the same search
+    as check_all, shared between all queries.
+
+    Each partial model carries the queries still worth checking below it:
+    a query is dropped once it is true in all completions of the partial
+    model or has been falsified anywhere. A partial model is skipped once
+    the knowledge base is false or no query is left, and the search stops
+    as soon as every query is falsified.
+    """
+    entailed = [True] * len(queries)
+    model = dict()
+    trail = []
+    stack = [(0, None, tuple(range(len(queries))))]
+    while stack:
+        depth, value, active = stack.pop()
+
+        # Undo assignments deeper than this one, then make it
+        while len(trail) > depth:
+            del model[trail.pop()]
+        if value is not None:
+            model[symbols[depth]] = value
+            trail.append(symbols[depth])
+            depth += 1
+
+        kb = knowledge.evaluate_partial(model)
+        if kb is False:
+            continue
+        undecided = []
+        for i in active:
+            if not entailed[i]:
+                continue
+            q = queries[i].evaluate_partial(model)
+            if q is True:
+                continue
+            if kb is True and q is False:
+                entailed[i] = False
+            else:
+                undecided.append(i)
+        if not any(entailed):
+            break
+        if not undecided:
+            continue
+
+        # Try the next symbol as true first, then as false
+        if depth < len(symbols):
+            undecided = tuple(undecided)
+            stack.append((depth, False, undecided))
+            stack.append((depth, True, undecided))
+    return entailed
+
+
+# Number of symbols whose models are packed into the bits of one integer
+BLOCK_SYMBOLS = 16
+
+
+def compile_bitwise(sentences, low):
+    """
+    Compiles sentences into a program evaluating them on a block of models
+    at once. Each value is an integer whose bit k is the truth value in
+    model k, so Not, And, Or, Implication and Biconditional become bitwise
+    operations over the whole block.
+
+    Symbols in low vary within a block; any other symbol is constant in a
+    block. Returns a tuple of the program, the indexes of the values of
+    sentences and the indexes of the values that can be reused across
+    blocks because they only depend on low symbols.
+    """
+    program = []
+    indexes = dict()
+    invariant = set()
+
+    def emit(sentence):
+        if sentence in indexes:
+            return indexes[sentence]
+        if isinstance(sentence, Symbol):
+            instruction = ("symbol", sentence.name)
+            operands = []
+        elif isinstance(sentence, Not):
+            instruction = ("not", emit(sentence.operand))
+            operands = [instruction[1]]
+        elif isinstance(sentence, (And, Or)):
+            operands = [emit(operand) for operand in (
+                sentence.conjuncts if isinstance(sentence, And)
+                else sentence.disjuncts
+            )]
+            instruction = ("and" if isinstance(sentence, And) else "or",
+                           tuple(operands))
+        elif isinstance(sentence, Implication):
+            operands = [emit(sentence.antecedent), emit(sentence.consequent)]
+            instruction = ("implies", *operands)
+        elif isinstance(sentence, Biconditional):
+            operands = [emit(sentence.left), emit(sentence.right)]
+            instruction = ("biconditional", *operands)
+        else:
+            raise TypeError("must be a logical sentence")
+        index = len(program)
+        program.append(instruction)
+        if (instruction[0] == "symbol" and instruction[1] in low) or (
+            instruction[0] != "symbol" and
+            all(operand in invariant for operand in operands)
+        ):
+            invariant.add(index)
+        indexes[sentence] = index
+        return index
+
+    roots = [emit(sentence) for sentence in sentences]
+    return program, roots, invariant
+
+
+def run_bitwise(program, columns, mask, values, skip):
+    """
+    Runs program on one block of models, where columns maps each symbol
+    to its bits and mask has a bit set for every model in the block.
+    Values listed in skip are already stored in values.
+    """
+    for index, instruction in enumerate(program):
+        if index in skip:
+            continue
+        op = instruction[0]
+        if op == "symbol":
+            value = columns[instruction[1]]
+        elif op == "not":
+            value = mask ^ values[instruction[1]]
+        elif op == "and":
+            value = mask
+            for operand in instruction[1]:
+                value &= values[operand]
+        elif op == "or":
+            value = 0
+            for operand in instruction[1]:
+                value |= values[operand]
+        elif op == "implies":
+            value = (mask ^ values[instruction[1]]) | values[instruction[2]]
+        else:
+            value = mask ^ (values[instruction[1]] ^ values[instruction[2]])
+        values[index] = value
+    return values
+
+
+def bitwise_blocks(sentences, symbols):
+    """
+    Yields, for each block of models over symbols, the mask of models in
+    the block and the bits of each sentence's truth value in those models.
+    """
+    symbols = sorted(symbols)
+    low, high = symbols[:BLOCK_SYMBOLS], symbols[BLOCK_SYMBOLS:]
+    size = 2 ** len(low)
+    mask = (1 << size) - 1
+
+    # Bit k of a low symbol's column is bit i of model number k
+    columns = dict()
+    for i, name in enumerate(low):
+        width = 2 ** i
+        column = ((1 << width) - 1) << width
+        width *= 2
+        while width < size:
+            column |= column << width
+            width *= 2
+        columns[name] = column
+    for name in high:
+        columns[name] = 0
+
+    program, roots, invariant = compile_bitwise(sentences, set(low))
+    values = run_bitwise(program, columns, mask, [None] * len(program),
+                         set())
+    for block in range(2 ** len(high)):
+        if block:
+            for j, name in enumerate(high):
+                columns[name] = mask if block >> j & 1 else 0
+            run_bitwise(program, columns, mask, values, invariant)
+        yield mask, [values[root] for root in roots]
+
+
+def bitwise_check(knowledge, query):
+    """
+    Checks if knowledge base entails query by evaluating both on blocks
+    of models with bitwise operations.
+    """
+    symbols = knowledge.symbols() | query.symbols()
+    for mask, (kb, q) in bitwise_blocks([knowledge, query], symbols):
+        if kb & (mask ^ q):
+            return False
+    return True
+
+
+def bitwise_check_all(knowledge, queries):
+    """
+    Checks which of queries the knowledge base entails, evaluating all of
+    them on the same blocks of models with bitwise operations.
+    """
+    symbols = knowledge.symbols().union(
+        *[query.symbols() for query in queries]
+    )
+    entailed = [True] * len(queries)
+    for mask, (kb, *values) in bitwise_blocks([knowledge, *queries], symbols):
+        for i, q in enumerate(values):
+            if entailed[i] and kb & (mask ^ q):
+                entailed[i] = False
+        if not any(entailed):
+            break
+    return entailed
+
+
+class CNF():
+    """
+    Conjunctive normal form of one or more sentences.
+
+    Top-level conjuncts become clauses directly where they can: an
+    implication or disjunction of literals and conjunctions is one clause,
+    so (p ∧ q) → r is ¬p ∨ ¬q ∨ r. Only compound subformulas nested deeper
+    get an auxiliary variable, with the Tseitin encoding so the size stays
+    linear. Sentences passed to add only need their variables to imply or
+    be implied by the subformula, depending on where it occurs
+    (Plaisted-Greenbaum), so only those definition clauses are added;
+    literal without a polarity defines both directions.
+
+    Variables are positive integers and literals are signed integers, as in
+    DIMACS: `-v` is the negation of `v`. Clauses are tuples of literals.
+    """
+
+    def __init__(self):
+        self.variables = dict()
+        self.count = 0
+        self.clauses = []
+        self.literals = dict()
+        self.defined = collections.defaultdict(set)
+
+    def variable(self):
+        """Returns a new auxiliary variable."""
+        self.count += 1
+        return self.count
+
+    def symbol(self, name):
+        """Returns the variable for the symbol called name."""
+        if name not in self.variables:
+            self.variables[name] = self.variable()
+        return self.variables[name]
+
+    def add(self, sentence):
+        """Adds clauses asserting that sentence is true."""
+        stack = [(sentence, True)]
+        while stack:
+            sentence, positive = stack.pop()
+            if isinstance(sentence, Not):
+                stack.append((sentence.operand, not positive))
+            elif isinstance(sentence, And) and positive:
+                stack.extend((c, True) for c in sentence.conjuncts)
+            elif isinstance(sentence, Or) and not positive:
+                stack.extend((d, False) for d in sentence.disjuncts)
+            elif isinstance(sentence, Implication) and not positive:
+                stack.extend([(sentence.antecedent, True),
+                              (sentence.consequent, False)])
+            elif isinstance(sentence, Biconditional) and positive:
+                stack.extend([
+                    (Implication(sentence.left, sentence.right), True),
+                    (Implication(sentence.right, sentence.left), True)
+                ])
+            else:
+                self.clauses.append(tuple(self.disjuncts(sentence, positive)))
+
+    def disjuncts(self, sentence, positive=True):
+        """
+        Returns literals whose disjunction is equivalent to sentence, or to
+        its negation if positive is False, for sentences that are true.
+        """
+        if isinstance(sentence, Not):
+            return self.disjuncts(sentence.operand, not positive)
+        if isinstance(sentence, Or) and positive:
+            return [literal for d in sentence.disjuncts
+                    for literal in self.disjuncts(d, True)]
+        if isinstance(sentence, And) and not positive:
+            return [literal for c in sentence.conjuncts
+                    for literal in self.disjuncts(c, False)]
+        if isinstance(sentence, Implication) and positive:
+            return (self.disjuncts(sentence.antecedent, False)
+                    + self.disjuncts(sentence.consequent, True))
+        if positive:
+            return [self.literal(sentence, True)]
+        return [-self.literal(sentence, False)]
+
+    def literal(self, sentence, polarity=None):
+        """
+        Returns a literal for sentence, adding the clauses that define any
+        auxiliary variable it needs: if polarity is True the literal implies
+        sentence, if False sentence implies the literal, and if None they
+        are equivalent.
+        """
+        if isinstance(sentence, Symbol):
+            return self.symbol(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand, None if polarity is None
+                                 else not polarity)
+        if sentence not in self.literals:
+            self.literals[sentence] = self.variable()
+        x = self.literals[sentence]
+
+        directions = {True, False} if polarity is None else {polarity}
+        for direction in directions - self.defined[x]:
+            self.defined[x].add(direction)
+
+            # Operand literals, needed with the same polarity or flipped
+            def same(s):
+                return self.literal(s, direction)
+
+            def flipped(s):
+                return self.literal(s, not direction)
+
+            if isinstance(sentence, And):
+                operands = [same(c) for c in sentence.conjuncts]
+                if direction:
+                    self.clauses.extend((-x, a) for a in operands)
+                else:
+                    self.clauses.append(tuple([x] + [-a for a in operands]))
+            elif isinstance(sentence, Or):
+                operands = [same(d) for d in sentence.disjuncts]
+                if direction:
+                    self.clauses.append(tuple([-x] + operands))
+                else:
+                    self.clauses.extend((x, -a) for a in operands)
+            elif isinstance(sentence, Implication):
+                a = flipped(sentence.antecedent)
+                b = same(sentence.consequent)
+                if direction:
+                    self.clauses.append((-x, -a, b))
+                else:
+                    self.clauses.extend([(x, a), (x, -b)])
+            elif isinstance(sentence, Biconditional):
+                a = self.literal(sentence.left)
+                b = self.literal(sentence.right)
+                if direction:
+                    self.clauses.extend([(-x, -a, b), (-x, a, -b)])
+                else:
+                    self.clauses.extend([(x, a, b), (x, -a, -b)])
+            else:
+                raise TypeError("must be a logical sentence")
+        return x
+
+
+def propagate(clauses, assignment):
+    """
+    Simplifies clauses with unit propagation and pure literal elimination,
+    recording the literals it sets in assignment.
+    Returns the remaining clauses, or None if a clause became false.
+    """
+    while True:
+        units = {clause[0] for clause in clauses if len(clause) == 1}
+        if not units:
+
+            # With no unit clauses left, set every pure literal
+            seen = set()
+            for clause in clauses:
+                seen.update(clause)
+            units = {literal for literal in seen if -literal not in seen}
+            if not units:
+                return clauses
+        if any(-literal in units for literal in units):
+            return None
+
+        assignment.update(units)
+        simplified = []
+        for clause in clauses:
+            if any(literal in units for literal in clause):
+                continue
+            clause = tuple(literal for literal in clause
+                           if -literal not in units)
+            if not clause:
+                return None
+            simplified.append(clause)
+        clauses = simplified
+
+
+def dpll(clauses):
+    """
+    Returns a set of true literals satisfying every clause, or None if the
+    clauses are unsatisfiable. Variables missing from the set can take
+    either value.
+    """
+    stack = [(list(clauses), set())]
+    while stack:
+        clauses, assignment = stack.pop()
+        assignment = set(assignment)
+        clauses = propagate(clauses, assignment)
+        if clauses is None:
+            continue
+        if not clauses:
+            return assignment
+
+        # Branch on a literal from the shortest clause, trying it first
+        literal = min(clauses, key=len)[0]
+        stack.append((clauses + [(-literal,)], assignment))
+        stack.append((clauses + [(literal,)], assignment))
+    return None
+
+
+def dpll_check(knowledge, query):
+    """
+    Checks if knowledge base entails query by showing with DPLL that
+    knowledge and the negation of query cannot both be true.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    return dpll(cnf.clauses) is None
+
+
+def dpll_check_all(knowledge, queries):
+    """
+    Checks which of queries the knowledge base entails with DPLL. Each
+    counter-model found rules out every query that is false in it, so the
+    knowledge base is encoded once and searched at most once per query.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    literals = [cnf.literal(query) for query in queries]
+
+    entailed = [True] * len(queries)
+    undecided = list(range(len(queries)))
+    while undecided:
+        i = undecided.pop()
+        solution = dpll(cnf.clauses + [(-literals[i],)])
+        if solution is None:
+            continue
+
+        # Symbols left unassigned can take any value, so make them false
+        model = {name: cnf.variables[name] in solution
+                 for name in cnf.variables}
+        entailed[i] = False
+        for j in list(undecided):
+            if not queries[j].evaluate(model):
+                entailed[j] = False
+                undecided.remove(j)
+    return entailed
+
+
+# Most resolvents resolution_check derives before falling back to DPLL
+MAX_RESOLVENTS = 20000
+
+
+class ClauseIndex():
+    """
+    Set of clauses, each a frozenset of literals, indexed by literal for
+    resolution and subsumption checks.
+    """
+
+    def __init__(self):
+        self.clauses = set()
+        self.index = collections.defaultdict(set)
+
+    def add(self, clause):
+        self.clauses.add(clause)
+        for literal in clause:
+            self.index[literal].add(clause)
+
+    def remove(self, clause):
+        self.clauses.discard(clause)
+        for literal in clause:
+            self.index[literal].discard(clause)
+
+    def subsumes(self, clause):
+        """Returns True if some clause in the set is a subset of clause."""
+        for literal in clause:
+            for other in self.index[literal]:
+                if other <= clause:
+                    return True
+        return False
+
+    def subsumed_by(self, clause):
+        """Returns the clauses in the set that are supersets of clause."""
+        if not clause:
+            return set(self.clauses)
+        postings = sorted((self.index[literal] for literal in clause),
+                          key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def resolvable(self, literal):
+        """Returns the clauses containing the negation of literal."""
+        return self.index[-literal]
+
+
+def tautology(clause):
+    """Returns True if clause contains a literal and its negation."""
+    return any(-literal in clause for literal in clause)
+
+
+def resolution_check(knowledge, query, trace=False, limit=None):
+    """
+    Checks if knowledge base entails query by resolution refutation.
+
+    Clauses of the knowledge base are kept as usable clauses, indexed by
+    literal. The set of support starts with the clauses of the negated
+    query and the unit clauses of the knowledge base, and every resolvent
+    goes back into it, so no two other clauses are resolved together.
+    Shortest clauses are resolved first, which chains facts forward
+    through rules; tautologies and subsumed clauses are dropped.
+
+    Without a refutation the search only ends by deriving every clause it
+    can, so after `limit` resolvents (MAX_RESOLVENTS by default) it gives
+    up and answers with dpll_check instead.
+
+    If trace is True, returns a tuple of the result and the proof, a list
+    of (clause, parent, parent) steps deriving the empty clause, with
+    clauses written as formulas and parents None for input clauses. An
+    inconsistent knowledge base entails every query, and its proof refutes
+    the knowledge base alone. The proof is empty if query is not entailed
+    and None if the search gave up.
+    """
+    if limit is None:
+        limit = MAX_RESOLVENTS
+    cnf = CNF()
+    cnf.add(knowledge)
+    support = len(cnf.clauses)
+    cnf.add(Not(query))
+
+    # Facts of the knowledge base join the set of support, so rules are
+    # also chained forward from them
+    facts = [clause for clause in cnf.clauses[:support] if len(clause) == 1]
+    rules = [clause for clause in cnf.clauses[:support] if len(clause) > 1]
+    parents, refuted = refute(rules, facts + cnf.clauses[support:], limit)
+    if refuted is False:
+        entailed = dpll_check(knowledge, query)
+        return (entailed, None) if trace else entailed
+    if refuted is not None:
+        entailed = True
+    else:
+        # Set of support is only complete for a satisfiable knowledge
+        # base, and an inconsistent one entails everything
+        entailed = dpll(cnf.clauses[:support]) is None
+        if entailed and trace:
+            parents, refuted = refute([], cnf.clauses[:support], limit)
+            if refuted is False:
+                return True, None
+
+    if not trace:
+        return entailed
+    return entailed, (proof(cnf, parents, refuted)
+                      if refuted is not None else [])
+
+
+def refute(usable_clauses, support_clauses, limit):
+    """
+    Searches for a refutation of the clauses by resolution with set of
+    support, resolving clauses from the set of support with each other and
+    with the usable clauses.
+
+    Returns a tuple of a dictionary mapping each derived clause to its
+    parents, or to None for input clauses, and the empty clause if it was
+    derived, None if the clauses are saturated without it, or False if the
+    search stopped after `limit` resolvents.
+    """
+    usable = ClauseIndex()
+    for clause in usable_clauses:
+        clause = frozenset(clause)
+        if not tautology(clause) and not usable.subsumes(clause):
+            for other in usable.subsumed_by(clause):
+                usable.remove(other)
+            usable.add(clause)
+
+    parents = dict()
+    queue = []
+    counter = itertools.count()
+    for clause in usable.clauses:
+        parents[clause] = None
+    for clause in support_clauses:
+        clause = frozenset(clause)
+        parents.setdefault(clause, None)
+        heapq.heappush(queue, (len(clause), next(counter), clause))
+
+    resolvents = 0
+    while queue:
+        _, _, given = heapq.heappop(queue)
+        if tautology(given) or usable.subsumes(given):
+            continue
+        if not given:
+            return parents, given
+
+        for literal in given:
+            for other in list(usable.resolvable(literal)):
+                resolvent = (given - {literal}) | (other - {-literal})
+                if tautology(resolvent) or resolvent in parents:
+                    continue
+                parents[resolvent] = (given, other)
+                if not resolvent:
+                    return parents, resolvent
+                resolvents += 1
+                if resolvents > limit:
+                    return parents, False
+                if not usable.subsumes(resolvent):
+                    heapq.heappush(queue, (len(resolvent), next(counter),
+                                           resolvent))
+
+        for other in usable.subsumed_by(given):
+            usable.remove(other)
+        usable.add(given)
+    return parents, None
+
+
+def proof(cnf, parents, clause):
+    """
+    Returns the resolution steps deriving clause, in order, as
+    (clause, parent, parent) tuples of formulas.
+    """
+    names = {variable: name for name, variable in cnf.variables.items()}
+
+    # Auxiliary variables are written as the subformula they stand for
+    for sentence, variable in cnf.literals.items():
+        names[variable] = Sentence.parenthesize(sentence.formula())
+
+    def formula(clause):
+        if not clause:
+            return "⊥"
+        literals = []
+        for literal in sorted(clause, key=abs):
+            name = names[abs(literal)]
+            literals.append(name if literal > 0 else "¬" + name)
+        return " ∨ ".join(literals)
+
+    steps = []
+    seen = set()
+    stack = [(clause, False)]
+    while stack:
+        clause, expanded = stack.pop()
+        if clause in seen:
+            continue
+        sources = parents.get(clause)
+        if expanded or sources is None:
+            seen.add(clause)
+            steps.append((formula(clause), *(
+                (formula(sources[0]), formula(sources[1]))
+                if sources is not None else (None, None)
+            )))
+        else:
+            stack.append((clause, True))
+            stack.extend((parent, False) for parent in sources)
+    return steps
@@ -89,8 +89,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
+            entailed = model_check_all(knowledge, symbols)
+            for symbol, is_entailed in zip(symbols, entailed):
+                if is_entailed:
                     print(f"    {symbol}")
 
 
@@ -0,0 +1,66 @@
+import time
+
+from logic import (And, Biconditional, Implication, Not, Or, Symbol,
+                   model_check, resolution_check)
+
+
+def horn_chain(rules):
+    """
+    Returns a knowledge base of fact S0 and rules S_i ∧ S_(i // 2) → S_(i+1),
+    and its symbols.
+    """
+    symbols = [Symbol(f"S{i}") for i in range(rules + 1)]
+    knowledge = And(symbols[0], *[
+        Implication(And(symbols[i], symbols[i // 2]), symbols[i + 1])
+        for i in range(rules)
+    ])
+    return knowledge, symbols
+
+
+def test_horn_chain():
+    knowledge, symbols = horn_chain(300)
+    start = time.perf_counter()
+    assert model_check(knowledge, symbols[-1], method="resolution")
+    assert not model_check(knowledge, Not(symbols[-1]), method="resolution")
+    assert time.perf_counter() - start < 5
+
+
+def test_proof_uses_symbols():
+    A, B, C = Symbol("A"), Symbol("B"), Symbol("C")
+    knowledge = And(Implication(A, B), Implication(B, C), A)
+    entailed, steps = resolution_check(knowledge, C, trace=True)
+    assert entailed
+    assert steps[-1][0] == "⊥"
+    assert ("A", None, None) in steps and ("¬A ∨ B", None, None) in steps
+    assert not any("_" in step[0] for step in steps)
+
+
+def test_inconsistent_knowledge():
+    A, B = Symbol("A"), Symbol("B")
+    entailed, steps = resolution_check(And(A, Not(A)), B, trace=True)
+    assert entailed
+    assert steps[-1] == ("⊥", "¬A", "A") or steps[-1] == ("⊥", "A", "¬A")
+
+
+def test_not_entailed():
+    A, B = Symbol("A"), Symbol("B")
+    assert resolution_check(Or(A, B), A, trace=True) == (False, [])
+
+
+def test_limit_falls_back():
+    A, B, C, D = Symbol("A"), Symbol("B"), Symbol("C"), Symbol("D")
+    knowledge = And(Biconditional(A, Or(B, C)), Biconditional(B, Or(C, D)),
+                    Or(A, D))
+    for query in [A, B, C, D, Or(A, B), Not(C)]:
+        expected = model_check(knowledge, query)
+        assert resolution_check(knowledge, query, limit=0) == expected
+        entailed, steps = resolution_check(knowledge, query, trace=True,
+                                           limit=0)
+        assert entailed == expected and steps is None
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+    print("All tests passed.")
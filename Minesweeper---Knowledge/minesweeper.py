@@ -1,6 +1,10 @@
+import collections
 import itertools
+import math
 import random
 
+import numpy as np
+
 class Minesweeper():
     """
     Minesweeper game representation
@@ -82,7 +86,59 @@ class Minesweeper():
         Checks if all mines have been flagged.
         """
         return self.mines_found == self.mines
-    
+
+
+class ArrayMinesweeper(Minesweeper):
+    """
+    Minesweeper game representation backed by numpy arrays, for very large
+    boards. Mines are placed by sampling without replacement and the number
+    of nearby mines of every cell is computed once, so nearby_mines is a
+    lookup. Has the same interface as Minesweeper.
+    """
+
+    def __init__(self, height=8, width=8, mines=8):
+
+        # Set initial width, height, and number of mines
+        self.height = height
+        self.width = width
+
+        # Place mines at distinct random cells, seeded from `random`
+        rng = np.random.default_rng(random.getrandbits(64))
+        positions = rng.choice(height * width, size=mines, replace=False)
+        self.board = np.zeros((height, width), dtype=bool)
+        self.board.flat[positions] = True
+        rows, columns = np.divmod(positions, width)
+        self.mines = set(zip(rows.tolist(), columns.tolist()))
+
+        # Count mines in each cell's 3x3 window, then leave out the cell
+        padded = np.pad(self.board, 1).astype(np.uint8)
+        counts = np.zeros((height, width), dtype=np.uint8)
+        for i in range(3):
+            for j in range(3):
+                counts += padded[i:i + height, j:j + width]
+        self.counts = counts - self.board
+
+        # At first, player has found no mines
+        self.mines_found = set()
+
+    def is_mine(self, cell):
+        return bool(self.board[cell])
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        return int(self.counts[cell])
+
+    def won(self):
+        """
+        Checks if all mines have been flagged.
+        """
+        return (len(self.mines_found) == len(self.mines)
+                and all(self.board[cell] for cell in self.mines_found))
+
 
 class Sentence():
     """
@@ -128,44 +184,199 @@ class Sentence():
         if cell in self.cells:
             self.cells.remove(cell)
 
+class SentenceStore():
+    """
+    Set of (cells, count) sentences indexed by cell, where each cell's
+    sentences are bucketed by size, so subsets and supersets of a sentence
+    are found from the posting lists of its own cells.
+    """
+
+    def __init__(self):
+        self.sentences = set()
+        self.by_cell = dict()
+
+    def __contains__(self, sentence):
+        return sentence in self.sentences
+
+    def __iter__(self):
+        return iter(self.sentences)
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def add(self, sentence):
+        self.sentences.add(sentence)
+        size = len(sentence[0])
+        for cell in sentence[0]:
+            buckets = self.by_cell.setdefault(cell, dict())
+            buckets.setdefault(size, set()).add(sentence)
+
+    def remove(self, sentence):
+        self.sentences.discard(sentence)
+        size = len(sentence[0])
+        for cell in sentence[0]:
+            buckets = self.by_cell[cell]
+            buckets[size].discard(sentence)
+            if not buckets[size]:
+                del buckets[size]
+            if not buckets:
+                del self.by_cell[cell]
+
+    def containing(self, cell):
+        """
+        Returns a list of the sentences that mention cell.
+        """
+        return [sentence for bucket in self.by_cell.get(cell, {}).values()
+                for sentence in bucket]
+
+    def supersets(self, cells):
+        """
+        Returns the sentences whose cells are a strict superset of cells,
+        by intersecting the cells' posting lists one size at a time.
+        """
+        postings = sorted(
+            (self.by_cell.get(cell, {}) for cell in cells),
+            key=lambda buckets: sum(map(len, buckets.values()))
+        )
+        result = []
+        for size, bucket in postings[0].items():
+            if size > len(cells):
+                result.extend(bucket.intersection(
+                    *[buckets.get(size, ()) for buckets in postings[1:]]
+                ))
+        return result
+
+    def subsets(self, cells):
+        """
+        Returns the sentences whose cells are a strict subset of cells,
+        only looking at smaller sentences that mention one of them.
+        """
+        result = set()
+        for cell in cells:
+            for size, bucket in self.by_cell.get(cell, {}).items():
+                if size < len(cells):
+                    result.update(sentence for sentence in bucket
+                                  if sentence[0] < cells)
+        return list(result)
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Total number of mines on the board, if known. When it is,
+        # guesses pick the cell least likely to be a mine
+        self.mine_count = mines
+
+        # Mine counts of constraint components seen on the last guess
+        self.component_cache = dict()
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
+        # Cells neither clicked on nor known to be mines, and the index
+        # of each in that list, so cells can be removed by swapping
+        self.unknown = [(i, j) for i in range(height) for j in range(width)]
+        self.unknown_index = {cell: i for i, cell in enumerate(self.unknown)}
+
         # Keep track of cells known to be safe or mines
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Sentences about the game known to be true, as (cells, count)
+        # pairs of a frozenset of cells and how many of them are mines
+        self.knowledge = SentenceStore()
+
+        # Sentences that are new or changed since inference last ran
+        self.queue = collections.deque()
+
+    def discard_unknown(self, cell):
+        """
+        Removes a cell from the unknown cells, if there, by moving the
+        last unknown cell into its place.
+        """
+        index = self.unknown_index.pop(cell, None)
+        if index is None:
+            return
+        last = self.unknown.pop()
+        if last != cell:
+            self.unknown[index] = last
+            self.unknown_index[last] = index
+
+    def add_sentence(self, cells, count):
+        """
+        Adds the sentence that `count` of `cells` are mines to knowledge,
+        and queues it for inference.
+        Empty and already known sentences are ignored.
+        """
+        sentence = (frozenset(cells), count)
+        if not sentence[0] or sentence in self.knowledge:
+            return
+        self.knowledge.add(sentence)
+        self.queue.append(sentence)
 
     def update_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
+        if cell in self.mines:
+            return
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.discard_unknown(cell)
+
+        # Only sentences mentioning the cell change
+        for cells, count in self.knowledge.containing(cell):
+            self.knowledge.remove((cells, count))
+            self.add_sentence(cells - {cell}, count - 1)
 
     def update_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
+        if cell in self.safes:
+            return
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        for cells, count in self.knowledge.containing(cell):
+            self.knowledge.remove((cells, count))
+            self.add_sentence(cells - {cell}, count)
+
+    def infer(self):
+        """
+        Draws every conclusion from the queued sentences until there are
+        none left: sentences with no mines mark their cells safe, sentences
+        with only mines mark them as mines, and a sentence whose cells are a
+        subset of another's gives a sentence about the difference.
+        Every new or changed sentence is queued, so only sentences
+        affected by a change are looked at again.
+        """
+        while self.queue:
+            sentence = self.queue.popleft()
+            if sentence not in self.knowledge:
+                continue
+            cells, count = sentence
+
+            if count == 0:
+                for cell in cells:
+                    self.update_safe(cell)
+                continue
+            if count == len(cells):
+                for cell in cells:
+                    self.update_mine(cell)
+                continue
+
+            for otherCells, otherCount in self.knowledge.supersets(cells):
+                self.add_sentence(otherCells - cells, otherCount - count)
+            for otherCells, otherCount in self.knowledge.subsets(cells):
+                self.add_sentence(cells - otherCells, count - otherCount)
 
     def make_safe_move(self):
         """
@@ -179,6 +390,7 @@ class MinesweeperAI():
         for move in self.safes:
             if move not in self.moves_made:
                 self.moves_made.add(move)
+                self.discard_unknown(move)
                 return move
 
     def make_random_move(self):
@@ -187,26 +399,131 @@ class MinesweeperAI():
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+        If the total number of mines is known, chooses the cell least
+        likely to be a mine instead.
         """
-        possibleMoves = []
-        if len(self.moves_made) + len(self.mines) == self.height*self.width:
+        if not self.unknown:
             return None #means that all the cells were filled
-        
-        for i in range(self.height):
-            for j in range(self.width):
-                if (i,j) not in self.mines and (i,j) not in self.moves_made:
-                    possibleMoves.append((i,j))
-        
-        return random.choice(possibleMoves)
+
+        if self.mine_count is not None:
+            probabilities = self.mine_probabilities()
+            if probabilities:
+                lowest = min(probabilities.values())
+                return random.choice([
+                    cell for cell, p in probabilities.items()
+                    if p <= lowest + 1e-12
+                ])
+
+        return random.choice(self.unknown)
 
     
     
+    def mine_probabilities(self):
+        """
+        Returns a dictionary mapping every cell not yet chosen and not known
+        to be a mine to the probability that it is a mine, given all
+        knowledge and the total number of mines.
+
+        Cells in sentences are split into components that share no
+        sentence. Mine configurations of each component are counted by how
+        many mines they use, then components are combined and weighted by
+        the number of ways to place the remaining mines among cells no
+        sentence mentions. Returns an empty dictionary if the knowledge
+        does not match the number of mines.
+        """
+        unknown = self.unknown
+        remaining = self.mine_count - len(self.mines)
+
+        # Count configurations of each component, reusing unchanged ones
+        cache = dict()
+        components = []
+        for sentences in self.components():
+            if sentences not in cache:
+                cache[sentences] = (self.component_cache.get(sentences)
+                                    or count_configurations(sentences))
+            components.append(cache[sentences])
+        self.component_cache = cache
+
+        frontier = set()
+        for totals, cells in components:
+            frontier.update(cells)
+        unconstrained = [cell for cell in unknown
+                         if cell not in frontier and cell not in self.safes]
+
+        def weight(mines):
+            """Ways to place the other mines among unconstrained cells."""
+            if 0 <= remaining - mines <= len(unconstrained):
+                return math.comb(len(unconstrained), remaining - mines)
+            return 0
+
+        # Distribution of mines over all components but one
+        prefixes = [{0: 1}]
+        for totals, cells in components:
+            prefixes.append(convolve(prefixes[-1], totals))
+        suffixes = [{0: 1}]
+        for totals, cells in reversed(components):
+            suffixes.append(convolve(suffixes[-1], totals))
+        suffixes.reverse()
+
+        everything = prefixes[-1]
+        total = sum(n * weight(mines) for mines, n in everything.items())
+        if total == 0:
+            return dict()
+
+        probabilities = {cell: 0.0 for cell in self.safes
+                         if cell in self.unknown_index}
+        for index, (totals, cells) in enumerate(components):
+            others = convolve(prefixes[index], suffixes[index + 1])
+            for mines, counts in cells_by_mines(cells).items():
+                ways = sum(n * weight(mines + rest)
+                           for rest, n in others.items())
+                for cell, n in counts.items():
+                    probabilities[cell] = (probabilities.get(cell, 0)
+                                           + n * ways / total)
+        if unconstrained:
+            expected = sum(n * weight(mines) * (remaining - mines)
+                           for mines, n in everything.items())
+            for cell in unconstrained:
+                probabilities[cell] = expected / total / len(unconstrained)
+        return probabilities
+
+    def components(self):
+        """
+        Returns the sentences in knowledge grouped into components, each a
+        frozenset of sentences, such that no cell is in two components.
+        """
+        components = []
+        seen = set()
+        for sentence in self.knowledge:
+            if sentence in seen:
+                continue
+            seen.add(sentence)
+            component = []
+            stack = [sentence]
+            while stack:
+                current = stack.pop()
+                component.append(current)
+                for cell in current[0]:
+                    for other in self.knowledge.containing(cell):
+                        if other not in seen:
+                            seen.add(other)
+                            stack.append(other)
+            components.append(frozenset(component))
+        return components
+
     def add_knowledge(self, cell, count):
+        """
+        Called when the Minesweeper board tells us, for a given
+        safe cell, how many neighboring cells have mines in them.
+        Records the move, marks the cell safe, adds a sentence about its
+        undetermined neighbors and infers everything that follows.
+        """
 
         #1
         self.moves_made.add(cell)
+        self.discard_unknown(cell)
         #2
-        self.safes.add(cell)
+        self.update_safe(cell)
         #3
         undeterminedCells = []
         countMines = 0
@@ -223,26 +540,104 @@ class MinesweeperAI():
                 countMines += 1
             if neighbouring_cell not in self.mines and neighbouring_cell not in self.safes:
                 undeterminedCells.append(neighbouring_cell)
-                
-        newSentence = Sentence(undeterminedCells, count - countMines)
-        self.knowledge.append(newSentence)
+
+        self.add_sentence(undeterminedCells, count - countMines)
 
         # 4 e 5
-        for sentence in self.knowledge:
-            if len(sentence.cells) == 0:
-                self.knowledge.remove(sentence)
-                
-            safe_cells = list(sentence.known_safes())
-            mines = list(sentence.known_mines())
-
-            for safe in safe_cells:
-                self.update_safe(safe)
-            for mine in mines:
-                self.update_mine(mine)
-        
+        self.infer()
 
-        for sentence in self.knowledge:
-            if newSentence.cells.issubset(sentence.cells) and sentence.count > 0 and newSentence.count > 0 and newSentence != sentence:
-                newSubset = sentence.cells.difference(newSentence.cells)
-                newSentenceSubset = Sentence(list(newSubset), sentence.count - newSentence.count)
-                self.knowledge.append(newSentenceSubset)
\ No newline at end of file
+
+def count_configurations(sentences):
+    """
+    Counts the ways to place mines in the cells of sentences so that every
+    sentence holds. Returns a tuple of a dictionary mapping each number of
+    mines to the number of configurations using it, and a dictionary
+    mapping each cell to a dictionary from each number of mines to the
+    number of those configurations where the cell is a mine.
+
+    Cells are assigned one at a time in an order that keeps sentences
+    short-lived, abandoning any assignment that breaks a sentence, and
+    results for the remaining cells are memoized on how many mines each
+    sentence still needs.
+    """
+    sentences = list(sentences)
+
+    # Order cells so neighbouring cells are assigned close together
+    order = []
+    placed = set()
+    for cells, count in sentences:
+        for cell in sorted(cells):
+            if cell not in placed:
+                placed.add(cell)
+                order.append(cell)
+    position = {cell: i for i, cell in enumerate(order)}
+
+    # For each cell, its sentences and how many of their cells come after
+    constraints = [[] for _ in order]
+    for index, (cells, count) in enumerate(sentences):
+        positions = sorted(position[cell] for cell in cells)
+        for k, i in enumerate(positions):
+            constraints[i].append((index, len(positions) - k - 1))
+
+    memo = dict()
+
+    def solve(i, needed):
+        """
+        Returns a dictionary mapping numbers of mines among cells i onwards
+        to a list of the number of configurations and, for each of those
+        cells, how many configurations make it a mine.
+        """
+        if i == len(order):
+            return {0: [1]}
+        if (i, needed) in memo:
+            return memo[(i, needed)]
+        result = dict()
+        for mine in (0, 1):
+            remaining = list(needed)
+            for index, after in constraints[i]:
+                remaining[index] -= mine
+                if not 0 <= remaining[index] <= after:
+                    break
+            else:
+                for mines, counts in solve(i + 1, tuple(remaining)).items():
+                    entry = result.setdefault(
+                        mines + mine, [0] * (len(order) - i + 1)
+                    )
+                    entry[0] += counts[0]
+                    if mine:
+                        entry[1] += counts[0]
+                    for k in range(1, len(counts)):
+                        entry[k + 1] += counts[k]
+        memo[(i, needed)] = result
+        return result
+
+    solutions = solve(0, tuple(count for cells, count in sentences))
+    totals = {mines: counts[0] for mines, counts in solutions.items()}
+    cells = {
+        cell: {mines: counts[i + 1] for mines, counts in solutions.items()}
+        for i, cell in enumerate(order)
+    }
+    return totals, cells
+
+
+def cells_by_mines(cells):
+    """
+    Regroups per-cell counts from count_configurations by number of mines.
+    """
+    grouped = dict()
+    for cell, counts in cells.items():
+        for mines, n in counts.items():
+            grouped.setdefault(mines, dict())[cell] = n
+    return grouped
+
+
+def convolve(first, second):
+    """
+    Returns the distribution of total mines of two independent parts,
+    given each part's number of configurations by number of mines.
+    """
+    result = dict()
+    for a, x in first.items():
+        for b, y in second.items():
+            result[a + b] = result.get(a + b, 0) + x * y
+    return result
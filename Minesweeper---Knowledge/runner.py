@@ -2,6 +2,7 @@ import pygame
 import sys
 import time
 
+from concurrent.futures import ThreadPoolExecutor
 from minesweeper import Minesweeper, MinesweeperAI
 
 HEIGHT = 8
@@ -39,7 +40,7 @@ mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
 # Create game and AI agent
 game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
 
 # Keep track of revealed cells, flagged cells, and if a mine was hit
 revealed = set()
@@ -49,17 +50,76 @@ lost = False
 # Show instructions initially
 instructions = True
 
+# The AI thinks in a background thread while the window keeps running
+FPS = 30
+clock = pygame.time.Clock()
+executor = ThreadPoolExecutor(max_workers=1)
+pending = None
+thinking_since = None
+
+# What each cell showed when it was last drawn, so only changes redraw
+drawn = dict()
+
+# Rectangles for cells and side panel
+cells = [
+    [
+        pygame.Rect(
+            board_origin[0] + j * cell_size,
+            board_origin[1] + i * cell_size,
+            cell_size, cell_size
+        )
+        for j in range(WIDTH)
+    ]
+    for i in range(HEIGHT)
+]
+panel = pygame.Rect((2 / 3) * width, 0, width / 3, height)
+
+
+def choose_move(ai, game):
+    """
+    Returns the AI's next move and a message describing it, after the AI
+    has learned from the move unless it hit a mine.
+    Runs in the background thread.
+    """
+    move = ai.make_safe_move()
+    if move is not None:
+        message = "AI making safe move."
+    else:
+        move = ai.make_random_move()
+        if move is None:
+            return None, "No moves left to make."
+        message = "No known safe moves, AI making random move."
+    if not game.is_mine(move):
+        ai.add_knowledge(move, game.nearby_mines(move))
+    return move, message
+
+
+def cell_state(cell):
+    """
+    Returns what a cell should show: a mine, a flag, a number or nothing.
+    """
+    if game.is_mine(cell) and lost:
+        return "mine"
+    elif cell in flags:
+        return "flag"
+    elif cell in revealed:
+        return game.nearby_mines(cell)
+    return None
+
+
 while True:
 
-    # Check if game quit
+    # Check if game quit, and collect mouse clicks
+    clicks = []
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             sys.exit()
-
-    screen.fill(BLACK)
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            clicks.append((event.button, event.pos))
 
     # Show game instructions
     if instructions:
+        screen.fill(BLACK)
 
         # Title
         title = largeFont.render("Play Minesweeper", True, WHITE)
@@ -88,47 +148,43 @@ while True:
         screen.blit(buttonText, buttonTextRect)
 
         # Check if play button clicked
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1:
-            mouse = pygame.mouse.get_pos()
-            if buttonRect.collidepoint(mouse):
+        for button, mouse in clicks:
+            if button == 1 and buttonRect.collidepoint(mouse):
                 instructions = False
-                time.sleep(0.3)
+                screen.fill(BLACK)
+                drawn = dict()
 
         pygame.display.flip()
+        clock.tick(FPS)
         continue
 
-    # Draw board
-    cells = []
+    # Draw cells that changed since they were last drawn
+    dirty = []
     for i in range(HEIGHT):
-        row = []
         for j in range(WIDTH):
-
-            # Draw rectangle for cell
-            rect = pygame.Rect(
-                board_origin[0] + j * cell_size,
-                board_origin[1] + i * cell_size,
-                cell_size, cell_size
-            )
+            state = cell_state((i, j))
+            if (i, j) in drawn and drawn[(i, j)] == state:
+                continue
+            drawn[(i, j)] = state
+            rect = cells[i][j]
             pygame.draw.rect(screen, GRAY, rect)
             pygame.draw.rect(screen, WHITE, rect, 3)
 
             # Add a mine, flag, or number if needed
-            if game.is_mine((i, j)) and lost:
+            if state == "mine":
                 screen.blit(mine, rect)
-            elif (i, j) in flags:
+            elif state == "flag":
                 screen.blit(flag, rect)
-            elif (i, j) in revealed:
-                neighbors = smallFont.render(
-                    str(game.nearby_mines((i, j))),
-                    True, BLACK
-                )
+            elif state is not None:
+                neighbors = smallFont.render(str(state), True, BLACK)
                 neighborsTextRect = neighbors.get_rect()
                 neighborsTextRect.center = rect.center
                 screen.blit(neighbors, neighborsTextRect)
+            dirty.append(rect)
 
-            row.append(rect)
-        cells.append(row)
+    # Redraw the side panel every frame
+    screen.fill(BLACK, panel)
+    dirty.append(panel)
 
     # AI Move button
     aiButton = pygame.Rect(
@@ -138,7 +194,7 @@ while True:
     buttonText = mediumFont.render("AI Move", True, BLACK)
     buttonRect = buttonText.get_rect()
     buttonRect.center = aiButton.center
-    pygame.draw.rect(screen, WHITE, aiButton)
+    pygame.draw.rect(screen, WHITE if pending is None else GRAY, aiButton)
     screen.blit(buttonText, buttonRect)
 
     # Reset button
@@ -153,70 +209,77 @@ while True:
     screen.blit(buttonText, buttonRect)
 
     # Display text
-    text = "Lost" if lost else "Won" if game.mines == flags else ""
-    text = mediumFont.render(text, True, WHITE)
+    if pending is not None:
+        text = f"Thinking... {time.monotonic() - thinking_since:.1f}s"
+        text = smallFont.render(text, True, WHITE)
+    else:
+        text = "Lost" if lost else "Won" if game.mines == flags else ""
+        text = mediumFont.render(text, True, WHITE)
     textRect = text.get_rect()
     textRect.center = ((5 / 6) * width, (2 / 3) * height)
     screen.blit(text, textRect)
 
-    move = None
-
-    left, _, right = pygame.mouse.get_pressed()
-
-    # Check for a right-click to toggle flagging
-    if right == 1 and not lost:
-        mouse = pygame.mouse.get_pos()
-        for i in range(HEIGHT):
-            for j in range(WIDTH):
-                if cells[i][j].collidepoint(mouse) and (i, j) not in revealed:
-                    if (i, j) in flags:
-                        flags.remove((i, j))
-                    else:
-                        flags.add((i, j))
-                    time.sleep(0.2)
-
-    elif left == 1:
-        mouse = pygame.mouse.get_pos()
-
-        # If AI button clicked, make an AI move
-        if aiButton.collidepoint(mouse) and not lost:
-            move = ai.make_safe_move()
+    # Pick up the AI's move, or what it learned from the user's move,
+    # before handling clicks so a click can't replace it
+    if pending is not None and pending.done():
+        outcome = pending.result()
+        pending = None
+        if outcome is not None:
+            move, message = outcome
+            print(message)
             if move is None:
-                move = ai.make_random_move()
-                if move is None:
-                    flags = ai.mines.copy()
-                    print("No moves left to make.")
-                else:
-                    print("No known safe moves, AI making random move.")
+                flags = ai.mines.copy()
+            elif game.is_mine(move):
+                lost = True
             else:
-                print("AI making safe move.")
-            time.sleep(0.2)
-
-        # Reset game state
-        elif resetButton.collidepoint(mouse):
-            game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
-            revealed = set()
-            flags = set()
-            lost = False
-            continue
-
-        # User-made move
-        elif not lost:
+                revealed.add(move)
+
+    for button, mouse in clicks:
+
+        # Check for a right-click to toggle flagging
+        if button == 3 and not lost:
             for i in range(HEIGHT):
                 for j in range(WIDTH):
-                    if (cells[i][j].collidepoint(mouse)
-                            and (i, j) not in flags
-                            and (i, j) not in revealed):
-                        move = (i, j)
-
-    # Make move and update AI knowledge
-    if move:
-        if game.is_mine(move):
-            lost = True
-        else:
-            nearby = game.nearby_mines(move)
-            revealed.add(move)
-            ai.add_knowledge(move, nearby)
-
-    pygame.display.flip()
+                    if cells[i][j].collidepoint(mouse) and (i, j) not in revealed:
+                        if (i, j) in flags:
+                            flags.remove((i, j))
+                        else:
+                            flags.add((i, j))
+
+        elif button == 1:
+
+            # If AI button clicked, start an AI move in the background
+            if aiButton.collidepoint(mouse):
+                if not lost and pending is None:
+                    pending = executor.submit(choose_move, ai, game)
+                    thinking_since = time.monotonic()
+
+            # Reset game state
+            elif resetButton.collidepoint(mouse):
+                game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
+                ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
+                revealed = set()
+                flags = set()
+                lost = False
+                pending = None
+
+            # User-made move, unless the AI is still thinking; the AI
+            # learns from it in the background
+            elif not lost and pending is None:
+                for i in range(HEIGHT):
+                    for j in range(WIDTH):
+                        if (cells[i][j].collidepoint(mouse)
+                                and (i, j) not in flags
+                                and (i, j) not in revealed):
+                            if game.is_mine((i, j)):
+                                lost = True
+                            else:
+                                revealed.add((i, j))
+                                pending = executor.submit(
+                                    ai.add_knowledge, (i, j),
+                                    game.nearby_mines((i, j))
+                                )
+                                thinking_since = time.monotonic()
+
+    pygame.display.update(dirty)
+    clock.tick(FPS)
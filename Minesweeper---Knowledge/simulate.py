@@ -0,0 +1,85 @@
+import multiprocessing
+import random
+import sys
+import time
+
+from minesweeper import ArrayMinesweeper, MinesweeperAI
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in range(5, 8):
+        sys.exit("Usage: python simulate.py games height width density "
+                 "[processes] [seed]")
+    games = int(sys.argv[1])
+    height = int(sys.argv[2])
+    width = int(sys.argv[3])
+    mines = round(float(sys.argv[4]) * height * width)
+    processes = int(sys.argv[5]) if len(sys.argv) > 5 else None
+    seed = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+
+    start = time.perf_counter()
+    results = simulate(games, height, width, mines, processes, seed)
+    seconds = time.perf_counter() - start
+
+    # Summarize results over all games
+    wins = sum(won for won, latencies in results)
+    latencies = sorted(
+        latency for won, game in results for latency in game
+    )
+    print(f"Games: {games} on {height}x{width} with {mines} mines")
+    print(f"Win rate: {wins / games:.2%}")
+    print(f"Moves per second: {len(latencies) / seconds:.1f}")
+    for name, p in [("p50", 0.5), ("p90", 0.9), ("p99", 0.99),
+                    ("max", 1)]:
+        print(f"Latency {name}: {percentile(latencies, p) * 1000:.3f} ms")
+
+
+def simulate(games, height, width, mines, processes=None, seed=0):
+    """
+    Plays `games` games on a pool of processes, game `i` seeded with
+    `seed + i`. Returns a list with the result of each game.
+    """
+    arguments = [(seed + i, height, width, mines) for i in range(games)]
+    with multiprocessing.Pool(processes) as pool:
+        return pool.starmap(play, arguments, chunksize=max(1, games // 64))
+
+
+def play(seed, height, width, mines):
+    """
+    Plays one game of Minesweeper with MinesweeperAI, without a display.
+    Returns a tuple of whether the AI won and the seconds the AI took to
+    choose each move and learn from it.
+    """
+    random.seed(seed)
+    game = ArrayMinesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width, mines=mines)
+
+    latencies = []
+    revealed = 0
+    while revealed < height * width - mines:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        if move is None or game.is_mine(move):
+            latencies.append(time.perf_counter() - start)
+            return False, latencies
+        ai.add_knowledge(move, game.nearby_mines(move))
+        latencies.append(time.perf_counter() - start)
+        revealed += 1
+    return True, latencies
+
+
+def percentile(values, p):
+    """
+    Returns the `p` quantile of sorted list `values`, or 0 if it is empty.
+    """
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+if __name__ == "__main__":
+    main()
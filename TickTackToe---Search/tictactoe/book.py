@@ -0,0 +1,55 @@
+import sys
+
+import tictactoe as ttt
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python book.py [output]")
+    filename = sys.argv[1] if len(sys.argv) == 2 else ttt.BOOK
+
+    entries = solve()
+    save(entries, filename)
+    print(f"Wrote {len(entries)} positions to {filename}")
+
+
+def solve():
+    """
+    Returns a dictionary mapping the canonical key of every reachable
+    position that is not over to its best cell and value, with the cell
+    given in the canonical orientation.
+    """
+    entries = dict()
+    frontier = [ttt.encode(ttt.initial_state())]
+    while frontier:
+        position = frontier.pop()
+        xs, os, moves = position
+        if ttt.WINS[xs] or ttt.WINS[os] or moves == 9:
+            continue
+        key, symmetry = ttt.orient(position)
+        if key in entries:
+            continue
+        masks = ttt.SYMMETRY_MASKS[symmetry]
+        entries[key] = ttt.best_move((masks[xs], masks[os], moves))
+        for cell in range(9):
+            if not (xs | os) >> cell & 1:
+                frontier.append(ttt.play(position, cell))
+    return entries
+
+
+def save(entries, filename):
+    """
+    Writes `entries` to book file `filename` in the format read by
+    tictactoe.load_book.
+    """
+    with open(filename, "wb") as f:
+        f.write(ttt.MAGIC + ttt.RULES)
+        for key in sorted(entries):
+            cell, value = entries[key]
+            f.write((key << 6 | cell << 2 | value + 1).to_bytes(3, "big"))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,15 @@ import pygame
 import sys
 import time
 
+from concurrent.futures import ThreadPoolExecutor
+
 import tictactoe as ttt
 
+# Board size and how many in a row win
+ROWS = 3
+COLUMNS = 3
+LENGTH = 3
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -15,22 +22,58 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Tiles shrink to fit larger boards
+tile_size = min(80, 240 // max(ROWS, COLUMNS))
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
-board = ttt.initial_state()
-ai_turn = False
+board = ttt.initial_state(ROWS, COLUMNS)
+
+# The computer searches in a background thread so the window stays
+# responsive; its move is shown no sooner than AI_DELAY seconds
+FPS = 30
+AI_DELAY = 0.5
+clock = pygame.time.Clock()
+executor = ThreadPoolExecutor(max_workers=1)
+pending = None
+thinking_since = None
+
+# What each tile showed when it was last drawn, so only changes redraw
+drawn = dict()
+
+# Rectangles for tiles, title and play again button
+tile_origin = (width / 2 - (COLUMNS / 2 * tile_size),
+               height / 2 - (ROWS / 2 * tile_size))
+tiles = [
+    [
+        pygame.Rect(
+            tile_origin[0] + j * tile_size,
+            tile_origin[1] + i * tile_size,
+            tile_size, tile_size
+        )
+        for j in range(COLUMNS)
+    ]
+    for i in range(ROWS)
+]
+titleArea = pygame.Rect(0, 0, width, tile_origin[1])
+againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
+againArea = pygame.Rect(0, tile_origin[1] + ROWS * tile_size, width,
+                        height - tile_origin[1] - ROWS * tile_size)
 
 while True:
 
+    # Check if game quit, and collect mouse clicks
+    clicks = []
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             sys.exit()
-
-    screen.fill(black)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            clicks.append(event.pos)
 
     # Let user choose a player.
     if user is None:
+        screen.fill(black)
 
         # Draw title
         title = largeFont.render("Play Tic-Tac-Toe", True, white)
@@ -54,93 +97,94 @@ while True:
         screen.blit(playO, playORect)
 
         # Check if button is clicked
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1:
-            mouse = pygame.mouse.get_pos()
+        for mouse in clicks:
             if playXButton.collidepoint(mouse):
-                time.sleep(0.2)
                 user = ttt.X
             elif playOButton.collidepoint(mouse):
-                time.sleep(0.2)
                 user = ttt.O
-
-    else:
-
-        # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
-        tiles = []
-        for i in range(3):
-            row = []
-            for j in range(3):
-                rect = pygame.Rect(
-                    tile_origin[0] + j * tile_size,
-                    tile_origin[1] + i * tile_size,
-                    tile_size, tile_size
-                )
-                pygame.draw.rect(screen, white, rect, 3)
-
-                if board[i][j] != ttt.EMPTY:
-                    move = moveFont.render(board[i][j], True, white)
-                    moveRect = move.get_rect()
-                    moveRect.center = rect.center
-                    screen.blit(move, moveRect)
-                row.append(rect)
-            tiles.append(row)
-
-        game_over = ttt.terminal(board)
-        player = ttt.player(board)
-
-        # Show title
-        if game_over:
-            winner = ttt.winner(board)
-            if winner is None:
-                title = f"Game Over: Tie."
-            else:
-                title = f"Game Over: {winner} wins."
-        elif user == player:
-            title = f"Play as {user}"
+        if user is not None:
+            screen.fill(black)
+            drawn = dict()
+
+        pygame.display.flip()
+        clock.tick(FPS)
+        continue
+
+    # Draw tiles that changed since they were last drawn
+    dirty = []
+    for i in range(len(board)):
+        for j in range(len(board[i])):
+            if (i, j) in drawn and drawn[(i, j)] == board[i][j]:
+                continue
+            drawn[(i, j)] = board[i][j]
+            rect = tiles[i][j]
+            screen.fill(black, rect)
+            pygame.draw.rect(screen, white, rect, 3)
+
+            if board[i][j] != ttt.EMPTY:
+                move = moveFont.render(board[i][j], True, white)
+                moveRect = move.get_rect()
+                moveRect.center = rect.center
+                screen.blit(move, moveRect)
+            dirty.append(rect)
+
+    game_over = ttt.terminal(board, LENGTH)
+    player = ttt.player(board)
+
+    # Show title
+    if game_over:
+        winner = ttt.winner(board, LENGTH)
+        if winner is None:
+            title = f"Game Over: Tie."
         else:
-            title = f"Computer thinking..."
-        title = largeFont.render(title, True, white)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 30)
-        screen.blit(title, titleRect)
-
-        # Check for AI move
-        if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
-
-        # Check for a user move
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1 and user == player and not game_over:
-            mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
-                    if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
+            title = f"Game Over: {winner} wins."
+    elif user == player:
+        title = f"Play as {user}"
+    elif thinking_since is not None:
+        title = (f"Computer thinking... "
+                 f"{time.monotonic() - thinking_since:.1f}s")
+    else:
+        title = f"Computer thinking..."
+    title = largeFont.render(title, True, white)
+    titleRect = title.get_rect()
+    titleRect.center = ((width / 2), 30)
+    screen.fill(black, titleArea)
+    screen.blit(title, titleRect)
+    dirty.append(titleArea)
+
+    # Start the AI search, and play its move once it is ready
+    if user != player and not game_over:
+        if pending is None:
+            pending = executor.submit(ttt.minimax, board, LENGTH)
+            thinking_since = time.monotonic()
+        elif (pending.done()
+                and time.monotonic() - thinking_since >= AI_DELAY):
+            board = ttt.result(board, pending.result())
+            print(f"Computer searched {ttt.nodes} positions.")
+            pending = None
+            thinking_since = None
+
+    # Check for a user move, taking only one per frame
+    elif user == player and not game_over:
+        for mouse in clicks:
+            for i in range(len(board)):
+                for j in range(len(board[i])):
+                    if (ttt.player(board) == user
+                            and board[i][j] == ttt.EMPTY
+                            and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
-        if game_over:
-            againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
-            again = mediumFont.render("Play Again", True, black)
-            againRect = again.get_rect()
-            againRect.center = againButton.center
-            pygame.draw.rect(screen, white, againButton)
-            screen.blit(again, againRect)
-            click, _, _ = pygame.mouse.get_pressed()
-            if click == 1:
-                mouse = pygame.mouse.get_pos()
-                if againButton.collidepoint(mouse):
-                    time.sleep(0.2)
-                    user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
-
-    pygame.display.flip()
+    if game_over:
+        again = mediumFont.render("Play Again", True, black)
+        againRect = again.get_rect()
+        againRect.center = againButton.center
+        pygame.draw.rect(screen, white, againButton)
+        screen.blit(again, againRect)
+        dirty.append(againArea)
+        for mouse in clicks:
+            if againButton.collidepoint(mouse):
+                user = None
+                board = ttt.initial_state(ROWS, COLUMNS)
+
+    pygame.display.update(dirty)
+    clock.tick(FPS)
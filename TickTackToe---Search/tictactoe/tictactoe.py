@@ -2,21 +2,155 @@
 Tic Tac Toe Player
 """
 
+import hashlib
 import math
-import copy
+import os
+import time
 
 X = "X"
 O = "O"
 EMPTY = None
 
+#boards are any height by width, won by `length` in a row; the classic
+#3 by 3 game is solved exactly, larger ones are searched within a time budget
 
-def initial_state():
+#inside the search a position is a tuple (xs, os, moves): a bit mask of the
+#cells of each player, cell (i, j) being bit width * i + j, and the number
+#of moves made so far
+
+#order cells are tried in when searching: center, then corners, then edges
+MOVE_ORDER = [4, 0, 2, 6, 8, 1, 3, 5, 7]
+
+#masks of the 3 rows, 3 columns and 2 diagonals
+WIN_MASKS = [0b000000111, 0b000111000, 0b111000000,
+             0b001001001, 0b010010010, 0b100100100,
+             0b100010001, 0b001010100]
+
+#whether each 9-bit mask of one player's cells contains a line
+WINS = [any(mask & line == line for line in WIN_MASKS)
+        for mask in range(512)]
+
+#the 8 symmetries of the board, as the cell each cell is read from
+SYMMETRIES = [
+    [symmetry(i, j) for i in range(3) for j in range(3)]
+    for symmetry in (lambda i, j: (i, j), lambda i, j: (j, 2 - i),
+                     lambda i, j: (2 - i, 2 - j), lambda i, j: (2 - j, i),
+                     lambda i, j: (i, 2 - j), lambda i, j: (j, i),
+                     lambda i, j: (2 - i, j), lambda i, j: (2 - j, 2 - i))
+]
+
+#each symmetry applied to every 9-bit mask
+SYMMETRY_MASKS = [
+    [sum(1 << cell for cell, (i, j) in enumerate(cells)
+         if mask >> (3 * i + j) & 1)
+     for mask in range(512)]
+    for cells in SYMMETRIES
+]
+
+#kinds of values kept in the transposition table
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+#canonical position -> (value, kind), kept between calls to minimax
+table = dict()
+
+#positions visited by the last call to minimax
+nodes = 0
+
+#solution book written by book.py: a header of MAGIC and a digest of the
+#rules, then 3 bytes per canonical position packing its key, best cell
+#and value
+BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+MAGIC = b"TTT1"
+RULES = hashlib.sha256(repr((WIN_MASKS, SYMMETRIES)).encode()).digest()[:8]
+
+#canonical key -> (best cell, value), loaded from BOOK on first use
+book = None
+
+#seconds minimax may spend on a move on boards other than 3 by 3
+BUDGET = 1.0
+
+#score of a win, more than any heuristic evaluation can reach
+WIN = 1 << 40
+
+#(height, width, length) -> Game, built on first use
+games = dict()
+
+
+class Game():
+    """
+    Precomputed lines of a height by width board won by `length` in a row.
+    """
+
+    def __init__(self, height=3, width=3, length=3):
+        self.height = height
+        self.width = width
+        self.length = length
+        self.cells = height * width
+
+        # Every run of `length` cells in a row, column or diagonal
+        self.lines = []
+        for i in range(height):
+            for j in range(width):
+                for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                    end_i = i + di * (length - 1)
+                    end_j = j + dj * (length - 1)
+                    if 0 <= end_i < height and 0 <= end_j < width:
+                        self.lines.append(sum(
+                            1 << (width * (i + di * k) + j + dj * k)
+                            for k in range(length)
+                        ))
+
+        # Lines through each cell, the only ones a move there can complete
+        self.through = [
+            [line for line in self.lines if line >> cell & 1]
+            for cell in range(self.cells)
+        ]
+
+        # Cells nearest the center first, since they tend to be best
+        self.order = sorted(
+            range(self.cells),
+            key=lambda cell: (abs(cell // width - (height - 1) / 2)
+                              + abs(cell % width - (width - 1) / 2))
+        )
+
+        # (xs, os) -> (depth, value, kind, best cell), kept between moves
+        self.table = dict()
+
+    def won(self, mask, cell):
+        """
+        Returns True if the cells in `mask` complete a line through `cell`.
+        """
+        return any(mask & line == line for line in self.through[cell])
+
+    def winner(self, xs, os):
+        """
+        Returns X or O if they have a line, or None.
+        """
+        for line in self.lines:
+            if xs & line == line:
+                return X
+            elif os & line == line:
+                return O
+        return None
+
+
+def rules(board, length=3):
+    """
+    Returns the Game for the size of the board and win `length`.
+    """
+    size = (len(board), len(board[0]), length)
+    if size not in games:
+        games[size] = Game(*size)
+    return games[size]
+
+
+def initial_state(height=3, width=3):
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * width for _ in range(height)]
 
 
 def player(board):
@@ -24,18 +158,7 @@ def player(board):
     Returns player who has the next turn on a board.
     - always startes with X
     """
-    emp = 0
-
-
-    for i in range(len(board)):
-        for j in range(len(board[i])):
-            if board[i][j] == None:
-                emp += 1
-        
-    if (emp%2):
-        return X
-    else:
-        return O
+    return X if encode(board)[2] % 2 == 0 else O
 
 
 def actions(board):
@@ -48,7 +171,7 @@ def actions(board):
         for j in range(len(board[i])):
             if board[i][j] == EMPTY:
                 possible_actions.add((i,j))
-    
+
     return possible_actions
 
 
@@ -57,109 +180,387 @@ def result(board, action):
     Returns the board that results from making move (i, j) on the board
     """
     #see if the action is a valid action
-    if action not in actions(board):
+    i,j = action
+    if (not (0 <= i < len(board) and 0 <= j < len(board[0]))
+            or board[i][j] != EMPTY):
         raise Exception("Not valid action")
 
     #add action to the board without modifying it
-    i,j = action
-    board_copy = copy.deepcopy(board)
+    board_copy = [row[:] for row in board]
     #add the action (put X or O) based on the player's turn
     board_copy[i][j] = player(board)
     return board_copy
 
 
-def winner(board):
+def winner(board, length=3):
     """
     Returns the winner of the game, if there is one.
     """
-    for i in range(len(board)):
-        for j in range(len(board[i])):
-            if board[i][0] == board[i][1] == board[i][2]:
-                if board[i][0]==X:
-                    return X
-                elif board[i][0]==O:
-                    return O
-            elif board[0][j] == board[1][j] == board[2][j]:
-                if board[0][j]==X:
-                    return X
-                elif board[0][j]==O:
-                    return O
-            elif board[0][0] == board[1][1] == board[2][2] or board[0][2] == board[1][1] == board[2][0]:
-                if board[1][1]==X:
-                    return X
-                elif board[1][1]==O:
-                    return O
-            else:
-                return None #no winner (yet)
-    
-    
+    xs, os, _ = encode(board)
+    return rules(board, length).winner(xs, os)
+
 
-def terminal(board):
+def terminal(board, length=3):
     """
     Returns True if game is over, False otherwise.
     """
-    if winner(board) == X or winner(board) == O:
-        return True
-    for i in range(len(board)):
-        for j in range(len(board[i])):
-            if board[i][j]==EMPTY:
-                return False
-    return True #tie
-
+    xs, os, moves = encode(board)
+    return (rules(board, length).winner(xs, os) is not None
+            or moves == len(board) * len(board[0]))
 
 
-def utility(board):
+def utility(board, length=3):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
 
-    result = winner(board)
+    result = winner(board, length)
     if result == X:
         return 1
     elif result == O:
         return -1
     else:
         return 0
-                
 
 
-def minimax(board):
+def encode(board):
+    """
+    Returns the position (xs, os, moves) of a board.
+    """
+    xs = os = moves = 0
+    width = len(board[0])
+    for i in range(len(board)):
+        for j in range(width):
+            if board[i][j] == X:
+                xs |= 1 << (width * i + j)
+                moves += 1
+            elif board[i][j] == O:
+                os |= 1 << (width * i + j)
+                moves += 1
+    return xs, os, moves
+
+
+def decode(position, height=3, width=3):
+    """
+    Returns the board of a position (xs, os, moves).
+    """
+    xs, os, _ = position
+    return [[X if xs >> (width * i + j) & 1
+             else O if os >> (width * i + j) & 1
+             else EMPTY for j in range(width)] for i in range(height)]
+
+
+def play(position, cell):
+    """
+    Returns the position after the player to move takes `cell`.
+    """
+    xs, os, moves = position
+    if moves % 2 == 0:
+        return xs | 1 << cell, os, moves + 1
+    return xs, os | 1 << cell, moves + 1
+
+
+def minimax(board, length=3, budget=BUDGET):
     """
     Returns the optimal action for the current player on the board.
+    Boards other than 3 by 3 with 3 in a row are too big to solve, so the
+    best action found within `budget` seconds is returned instead.
+    The number of positions searched is left in `nodes`.
     """
-    if terminal(board): #game over
+    global nodes
+    nodes = 0
+    if terminal(board, length): #game over
         return None
-    
-    elif player(board)==X:
-        plays=[]
+    position = encode(board)
+    if (len(board), len(board[0]), length) != (3, 3, 3):
+        width = len(board[0])
+        cell = deepening(rules(board, length), position, budget)[0]
+        return divmod(cell, width)
+
+    #answer from the book when it has the position
+    if book is None:
+        load_book()
+    key, symmetry = orient(position)
+    if key in book:
+        i, j = SYMMETRIES[symmetry][book[key][0]]
+        return i, j
+
+    return divmod(best_move(position)[0], 3)
+
+
+def best_move(position):
+    """
+    Returns the best cell for the player to move in a position that is not
+    over, and the value of the position.
+    """
+    #search the root with alpha-beta, stopping at the first forced win
+    xs, os, moves = position
+    best_cell = None
+    taken = xs | os
+    if moves % 2 == 0:
+        best = -math.inf
+        for cell in MOVE_ORDER:
+            if taken >> cell & 1:
+                continue
+            v = min_search(play(position, cell), best, math.inf)
+            if v > best:
+                best, best_cell = v, cell
+                if best == 1:
+                    break
+    else:
+        best = math.inf
+        for cell in MOVE_ORDER:
+            if taken >> cell & 1:
+                continue
+            v = max_search(play(position, cell), -math.inf, best)
+            if v < best:
+                best, best_cell = v, cell
+                if best == -1:
+                    break
+    return best_cell, best
+
+
+def load_book(filename=BOOK):
+    """
+    Loads the solution book into `book`. A missing, damaged or stale file
+    (written for different rules) leaves the book empty, so minimax
+    searches instead.
+    """
+    global book
+    book = dict()
+    try:
+        with open(filename, "rb") as f:
+            data = f.read()
+    except OSError:
+        return
+    header = len(MAGIC) + len(RULES)
+    if (data[:header] != MAGIC + RULES
+            or (len(data) - header) % 3):
+        return
+    for k in range(header, len(data), 3):
+        entry = int.from_bytes(data[k:k + 3], "big")
+        book[entry >> 6] = ((entry >> 2) & 0b1111, (entry & 0b11) - 1)
+
+
+def orient(position):
+    """
+    Returns the canonical key of a position and the index of the symmetry
+    that maps it there.
+    """
+    xs, os, _ = position
+    return min(
+        (masks[xs] << 9 | masks[os], symmetry)
+        for symmetry, masks in enumerate(SYMMETRY_MASKS)
+    )
+
+
+def canonical(position):
+    """
+    Returns a key shared by the position and all its rotations and
+    reflections.
+    """
+    xs, os, _ = position
+    return min(masks[xs] << 9 | masks[os] for masks in SYMMETRY_MASKS)
+
+
+def lookup(position, alpha, beta):
+    """
+    Returns the key of the position and, if the transposition table settles
+    its value within the window, that value; otherwise the narrowed window.
+    """
+    key = canonical(position)
+    if key in table:
+        value, kind = table[key]
+        if kind == EXACT:
+            return key, value, alpha, beta
+        elif kind == LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return key, value, alpha, beta
+    return key, None, alpha, beta
+
+
+def store(key, v, alpha, beta):
+    """
+    Records the value found for a position searched with window
+    (alpha, beta): outside the window it is only a bound.
+    """
+    if v <= alpha:
+        table[key] = (v, UPPER)
+    elif v >= beta:
+        table[key] = (v, LOWER)
+    else:
+        table[key] = (v, EXACT)
 
-        for action in actions(board):
-            plays.append([min_value(result(board, action)), action])
-        return sorted(plays, key=lambda x: x[0], reverse=True)[0][1]
-    
-    elif player(board)==O:
-        plays=[]
 
-        for action in actions(board):
-            plays.append([max_value(result(board, action)), action])
-        return sorted(plays, key=lambda x: x[0])[0][1]
+def max_value(board, alpha=-math.inf, beta=math.inf):
+    return max_search(encode(board), alpha, beta)
 
 
-def max_value(board):
+def min_value(board, alpha=-math.inf, beta=math.inf):
+    return min_search(encode(board), alpha, beta)
+
+
+def max_search(position, alpha, beta):
+    global nodes
+    nodes += 1
+    xs, os, moves = position
+    if WINS[xs]: #game over?
+        return 1 #if yes, than who won
+    elif WINS[os]:
+        return -1
+    elif moves == 9:
+        return 0
+    key, value, alpha, beta = lookup(position, alpha, beta)
+    if value is not None:
+        return value
+    original = alpha
     v = -math.inf
-    if terminal(board): #game over?
-        return utility(board) #if yes, than who won
-    for action in actions(board):
-        v = max(v, min_value(result(board, action))) 
-        #its gonna choose the maximum value we can get with the possible actions
+    taken = xs | os
+    for cell in MOVE_ORDER:
+        if taken >> cell & 1:
+            continue
+        v = max(v, min_search(play(position, cell), alpha, beta))
+        #min won't let us get more than beta, and 1 is the best there is
+        if v >= beta or v == 1:
+            break
+        alpha = max(alpha, v)
+    store(key, v, original, beta)
     return v
 
 
-def min_value(board):
+def min_search(position, alpha, beta):
+    global nodes
+    nodes += 1
+    xs, os, moves = position
+    if WINS[xs]: #game over?
+        return 1 #if yes, than who won
+    elif WINS[os]:
+        return -1
+    elif moves == 9:
+        return 0
+    key, value, alpha, beta = lookup(position, alpha, beta)
+    if value is not None:
+        return value
+    original = beta
     v = math.inf
-    if terminal(board): #game over?
-        return utility(board) #if yes, than who won
-    for action in actions(board):
-        v = min(v, max_value(result(board, action))) 
-        #its gonna choose the minimum value we can get with the possible actions
-    return v
\ No newline at end of file
+    taken = xs | os
+    for cell in MOVE_ORDER:
+        if taken >> cell & 1:
+            continue
+        v = min(v, max_search(play(position, cell), alpha, beta))
+        #max won't let us get less than alpha, and -1 is the best there is
+        if v <= alpha or v == -1:
+            break
+        beta = min(beta, v)
+    store(key, v, alpha, original)
+    return v
+
+
+def deepening(game, position, budget=None):
+    """
+    Returns the best cell for the player to move, its score and the depth
+    searched, deepening the search one move at a time until the game is
+    solved or `budget` seconds have passed. The best cell of the deepest
+    completed search is returned; the first depth always completes.
+    """
+    deadline = None if budget is None else time.monotonic() + budget
+    xs, os, moves = position
+    best = None
+    for depth in range(1, game.cells - moves + 1):
+        try:
+            value, cell = negamax(game, position, depth, -math.inf, math.inf,
+                                  deadline if best else None)
+        except TimeoutError:
+            break
+        best = (cell, value, depth)
+
+        # Stop once either player can force a win
+        if abs(value) >= WIN:
+            break
+    return best
+
+
+def negamax(game, position, depth, alpha, beta, deadline):
+    """
+    Returns the score of a position for the player to move, searching
+    `depth` moves ahead with alpha-beta, and the best cell found. Raises
+    TimeoutError once `deadline` has passed.
+    """
+    global nodes
+    nodes += 1
+    if (deadline is not None and nodes % 1024 == 0
+            and time.monotonic() > deadline):
+        raise TimeoutError
+    xs, os, moves = position
+    if moves == game.cells:
+        return 0, None
+    if depth == 0:
+        return evaluate(game, xs, os, moves), None
+
+    # Narrow the window with what an earlier search of this position found
+    best_cell = None
+    original = alpha
+    if (xs, os) in game.table:
+        searched, value, kind, best_cell = game.table[(xs, os)]
+        if searched >= depth:
+            if kind == EXACT:
+                return value, best_cell
+            elif kind == LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value, best_cell
+
+    # Try the best cell found before first, then cells near the center
+    mine = xs if moves % 2 == 0 else os
+    taken = xs | os
+    order = game.order
+    if best_cell is not None:
+        order = [best_cell] + [cell for cell in order if cell != best_cell]
+
+    v = -math.inf
+    for cell in order:
+        if taken >> cell & 1:
+            continue
+        if game.won(mine | 1 << cell, cell):
+
+            # Sooner wins leave more empty cells and score higher
+            value = WIN + game.cells - moves - 1
+        else:
+            value = -negamax(game, play(position, cell), depth - 1,
+                             -beta, -alpha, deadline)[0]
+        if value > v:
+            v, best_cell = value, cell
+        alpha = max(alpha, v)
+        if alpha >= beta:
+            break
+
+    if v <= original:
+        kind = UPPER
+    elif v >= beta:
+        kind = LOWER
+    else:
+        kind = EXACT
+    game.table[(xs, os)] = (depth, v, kind, best_cell)
+    return v, best_cell
+
+
+def evaluate(game, xs, os, moves):
+    """
+    Returns a heuristic score of a position for the player to move: each
+    line still open to only one player counts for them, more the fuller
+    it is.
+    """
+    score = 0
+    for line in game.lines:
+        x = (xs & line).bit_count()
+        o = (os & line).bit_count()
+        if o == 0:
+            score += (1 << 3 * x) - 1
+        elif x == 0:
+            score -= (1 << 3 * o) - 1
+    return score if moves % 2 == 0 else -score